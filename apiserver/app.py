@@ -6,6 +6,7 @@ from datetime import datetime, date, timedelta
 import os
 from functools import wraps
 import re  # 新增：用于正则表达式处理
+import time
 
 # 初始化Flask应用
 app = Flask(__name__, template_folder='templates')
@@ -181,7 +182,7 @@ def migrate_database(conn):
         columns = [column[1] for column in cursor.fetchall()]
         
         required_columns = ['device_name', 'total_tasks', 'task_id', 'status', 
-                           'response_code', 'message', 'task_timestamp', 'upload_time']
+                           'response_code', 'message', 'task_timestamp', 'upload_time', 'account']
         
         for col in required_columns:
             if col not in columns:
@@ -313,6 +314,7 @@ def init_db():
                 message TEXT,
                 task_timestamp TEXT NOT NULL,
                 upload_time TEXT NOT NULL,
+                account TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
@@ -761,8 +763,8 @@ def add_reward_result(data):
                 conn.execute('''
                     INSERT OR REPLACE INTO reward_results 
                     (device_name, total_tasks, task_id, status, response_code, message, 
-                     task_timestamp, upload_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                     task_timestamp, upload_time, account)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     data.get('device_name', result.get('device_name')),
                     data.get('total_tasks', len(data['results'])),
@@ -771,7 +773,8 @@ def add_reward_result(data):
                     result.get('response_code'),
                     result.get('message'),
                     result.get('timestamp'),
-                    data.get('upload_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                    data.get('upload_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                    result.get('account')
                 ))
                 inserted_count += 1
             conn.commit()
@@ -781,8 +784,8 @@ def add_reward_result(data):
             conn.execute('''
                 INSERT OR REPLACE INTO reward_results 
                 (device_name, total_tasks, task_id, status, response_code, message, 
-                 task_timestamp, upload_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                 task_timestamp, upload_time, account)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 data.get('device_name'),
                 int(data.get('total_tasks', 1)),
@@ -791,7 +794,8 @@ def add_reward_result(data):
                 data.get('response_code'),
                 data.get('message'),
                 data.get('task_timestamp'),
-                data.get('upload_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                data.get('upload_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+                data.get('account')
             ))
             conn.commit()
             return True, "成功插入 1 条记录"
@@ -1784,6 +1788,20 @@ def get_announcements():
         'content': announcement_list
     })
 
+@app.route('/server_time')
+def server_time():
+    """
+    供客户端校时，返回收到请求和发出响应时的服务器时间（Unix时间戳，秒）
+    """
+    receive_time = time.time()
+    return jsonify({
+        'status': 'success',
+        'content': {
+            'receive_time': receive_time,
+            'send_time': time.time()
+        }
+    })
+
 @app.route('/upload_reward_result', methods=['POST'])
 def upload_reward_result():
     """供客户端上传奖励结果，支持批量上传"""
@@ -1857,6 +1875,47 @@ def upload_page_info():
             'message': str(e)
         }), 500
 
+@app.route('/upload_page_info_batch', methods=['POST'])
+def upload_page_info_batch():
+    """供客户端批量上传页面信息（任务信息抓取模式），全部保存后只自动处理一次"""
+    try:
+        data = request.json
+        items = data.get('items') if data else None
+        if not items:
+            return jsonify({'status': 'error', 'message': '无数据'}), 400
+        
+        required_fields = ['task_id', 'device_name', 'section_title', 'award_info', 'extract_time']
+        saved_count = 0
+        errors = []
+        for item in items:
+            missing = [field for field in required_fields if field not in item]
+            if missing:
+                errors.append(f"{item.get('task_id', '?')}: 缺少必要字段 {','.join(missing)}")
+                continue
+            success, msg = add_page_info(item)
+            if success:
+                saved_count += 1
+            else:
+                errors.append(f"{item.get('task_id')}: {msg}")
+        
+        if not saved_count:
+            return jsonify({'status': 'error', 'message': '没有保存任何页面信息', 'errors': errors}), 400
+        
+        auto_success, auto_msg = auto_process_tasks_after_upload()
+        return jsonify({
+            'status': 'success',
+            'message': f'保存 {saved_count}/{len(items)} 条页面信息 | 自动处理: {auto_msg}',
+            'saved_count': saved_count,
+            'errors': errors,
+            'auto_processed': bool(auto_success),
+            'auto_message': auto_msg
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error', 
+            'message': str(e)
+        }), 500
+
 @app.route('/upload_log_file', methods=['POST'])
 def upload_log_file():
     """供客户端上传日志文件"""
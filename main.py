@@ -1,3 +1,4 @@
+import multiprocessing
 import customtkinter as ctk
 from src.gui import AutoClickerGUI
 from src.config import config_manager
@@ -25,4 +26,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # 打包环境下多进程执行任务需要
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+from .utils import utils
+
+# 静态资源缓存配置
+ASSET_CACHE_DIR = "asset_cache"
+ASSET_CACHE_INDEX_FILE = "index.json"
+DEFAULT_CACHE_RESOURCE_TYPES = ["script", "stylesheet", "font"]
+DEFAULT_CACHE_URL_PATTERNS = ["hdslb.com"]      # B站静态资源CDN
+DEFAULT_MAX_ENTRY_BYTES = 5 * 1024 * 1024       # 单个资源的缓存上限
+DEFAULT_MAX_CACHE_MB = 200                      # 缓存目录总大小上限，超出时淘汰最久未使用的资源
+DEFAULT_REVALIDATE_CONCURRENCY = 2              # 后台重新验证的并发数
+
+# 路由只能按URL注册，用扩展名判断请求是否可能是可缓存的静态资源
+RESOURCE_TYPE_EXTENSIONS = {
+    "script": ["js", "mjs"],
+    "stylesheet": ["css"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"]
+}
+
+# 从缓存返回时不回放的响应头：正文已解码，长度和编码由fulfill重新计算
+SKIP_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie", "date", "age", "connection"}
+
+class AssetCache:
+    """内容寻址的静态资源缓存：按URL索引、按内容哈希存储，命中时直接从本地返回，并在后台用ETag/Last-Modified重新验证"""
+
+    def __init__(self, cache_dir=None, resource_types=None, url_patterns=None, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES,
+                 max_cache_mb=DEFAULT_MAX_CACHE_MB, revalidate=True):
+        self.cache_dir = cache_dir or os.path.join(utils.get_exe_directory(), ASSET_CACHE_DIR)
+        self.blob_dir = os.path.join(self.cache_dir, "blobs")
+        self.index_path = os.path.join(self.cache_dir, ASSET_CACHE_INDEX_FILE)
+        self.resource_types = set(resource_types if resource_types is not None else DEFAULT_CACHE_RESOURCE_TYPES)
+        self.url_patterns = url_patterns if url_patterns is not None else DEFAULT_CACHE_URL_PATTERNS
+        extensions = [extension for resource_type in self.resource_types
+                      for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type, [])]
+        self.extension_pattern = re.compile(r"\.(%s)$" % "|".join(extensions), re.IGNORECASE) if extensions else None
+        self.max_entry_bytes = max_entry_bytes
+        self.max_cache_bytes = max_cache_mb * 1024 * 1024
+        self.revalidate = revalidate
+        self.index = {}
+        self.bodies = {}
+        self.request_context = None
+        self.revalidated_urls = set()
+        self.revalidate_tasks = set()
+        self.revalidate_semaphore = asyncio.Semaphore(DEFAULT_REVALIDATE_CONCURRENCY)
+        self.page_counts = {}
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "not_modified": 0, "updated": 0, "bytes_served": 0}
+        self.load_index()
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的asset_cache配置创建缓存"""
+        return cls(
+            cache_dir=config.get("cache_dir"),
+            resource_types=config.get("resource_types"),
+            url_patterns=config.get("url_patterns"),
+            max_entry_bytes=config.get("max_entry_bytes", DEFAULT_MAX_ENTRY_BYTES),
+            max_cache_mb=config.get("max_cache_mb", DEFAULT_MAX_CACHE_MB),
+            revalidate=config.get("revalidate", True)
+        )
+
+    def load_index(self):
+        """加载缓存索引，丢弃内容文件已丢失的条目"""
+        try:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                self.index = {url: entry for url, entry in index.items() if os.path.exists(self.blob_path(entry["sha256"]))}
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 静态资源缓存索引加载失败: {str(e)}，使用空缓存")
+            self.index = {}
+
+    def save_index(self):
+        """淘汰超出总大小上限的资源并保存索引"""
+        try:
+            total = sum(entry["size"] for entry in self.index.values())
+            if total > self.max_cache_bytes:
+                for url, entry in sorted(self.index.items(), key=lambda item: item[1].get("last_used", 0)):
+                    if total <= self.max_cache_bytes:
+                        break
+                    del self.index[url]
+                    total -= entry["size"]
+            referenced = {entry["sha256"] for entry in self.index.values()}
+            for name in os.listdir(self.blob_dir):
+                if name not in referenced:
+                    os.remove(os.path.join(self.blob_dir, name))
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 静态资源缓存索引保存失败: {str(e)}")
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256)
+
+    @property
+    def is_cold(self):
+        """本地缓存为空时，本次运行的首批页面加载为冷加载"""
+        return not self.index
+
+    async def install(self, context):
+        """在浏览器上下文上注册路由，须先于请求路由规则注册，使拦截规则先生效再回落到缓存"""
+        self.request_context = context.request
+        await context.route(self.should_route, self.handle_route)
+
+    async def uninstall(self, context):
+        """从常驻的浏览器上下文上移除路由"""
+        await context.unroute(self.should_route, self.handle_route)
+
+    def should_route(self, url):
+        """路由的URL匹配函数：只匹配静态资源CDN上可缓存类型扩展名的URL，其余请求不经过路由"""
+        return bool(self.extension_pattern
+                    and any(pattern in url for pattern in self.url_patterns)
+                    and self.extension_pattern.search(urlparse(url).path))
+
+    def is_cacheable_request(self, request):
+        return (request.method == "GET"
+                and request.resource_type in self.resource_types
+                and any(pattern in request.url for pattern in self.url_patterns))
+
+    def is_cacheable_response(self, status, headers, body):
+        cache_control = headers.get("cache-control", "")
+        return status == 200 and "no-store" not in cache_control and len(body) <= self.max_entry_bytes
+
+    def record_page(self, request, hit):
+        """按页面统计命中情况，用于区分冷加载和热加载"""
+        try:
+            page = request.frame.page
+        except Exception:
+            return
+        counts = self.page_counts.setdefault(page, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def page_state(self, page):
+        """页面加载期间有未命中的静态资源为cold，全部命中为warm，未请求静态资源返回None"""
+        counts = self.page_counts.get(page)
+        if not counts:
+            return None
+        return "cold" if counts["misses"] else "warm"
+
+    async def read_body(self, entry):
+        sha256 = entry["sha256"]
+        if sha256 not in self.bodies:
+            path = self.blob_path(sha256)
+            self.bodies[sha256] = await asyncio.get_running_loop().run_in_executor(None, self.read_file, path)
+        return self.bodies[sha256]
+
+    @staticmethod
+    def read_file(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    async def store(self, url, status_headers, body):
+        """按内容哈希写入资源，相同内容只存一份"""
+        sha256 = hashlib.sha256(body).hexdigest()
+        path = self.blob_path(sha256)
+        if not os.path.exists(path):
+            await asyncio.get_running_loop().run_in_executor(None, self.write_file, path, body)
+        self.bodies[sha256] = body
+        self.index[url] = {
+            "sha256": sha256,
+            "size": len(body),
+            "headers": {name: value for name, value in status_headers.items() if name.lower() not in SKIP_RESPONSE_HEADERS},
+            "etag": status_headers.get("etag"),
+            "last_modified": status_headers.get("last-modified"),
+            "stored_at": time.time(),
+            "last_used": time.time()
+        }
+        self.stats["stored"] += 1
+
+    @staticmethod
+    def write_file(path, body):
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(body)
+        os.replace(temp_path, path)
+
+    async def handle_route(self, route):
+        request = route.request
+        if not self.is_cacheable_request(request):
+            await route.fallback()
+            return
+
+        url = request.url
+        entry = self.index.get(url)
+        if entry:
+            try:
+                body = await self.read_body(entry)
+            except Exception:
+                body = None
+            if body is not None:
+                self.stats["hits"] += 1
+                self.stats["bytes_served"] += len(body)
+                self.record_page(request, True)
+                entry["last_used"] = time.time()
+                await route.fulfill(status=200, headers=entry["headers"], body=body)
+                self.schedule_revalidation(url, entry)
+                return
+
+        self.stats["misses"] += 1
+        self.record_page(request, False)
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # 代取失败时交还给浏览器正常请求，避免请求一直挂起
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 静态资源代取失败: {url}: {str(e)}")
+            await route.fallback()
+            return
+        headers = response.headers
+        if self.is_cacheable_response(response.status, headers, body):
+            await self.store(url, headers, body)
+        await route.fulfill(response=response, body=body)
+
+    def schedule_revalidation(self, url, entry):
+        """每次运行对每个URL最多在后台重新验证一次"""
+        if not self.revalidate or url in self.revalidated_urls or not (entry.get("etag") or entry.get("last_modified")):
+            return
+        self.revalidated_urls.add(url)
+        task = asyncio.create_task(self.revalidate_entry(url, entry))
+        self.revalidate_tasks.add(task)
+        task.add_done_callback(self.revalidate_tasks.discard)
+
+    async def revalidate_entry(self, url, entry):
+        """条件请求：304只刷新验证时间，200则替换缓存内容，供下次使用"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        async with self.revalidate_semaphore:
+            try:
+                response = await self.request_context.get(url, headers=headers)
+                if response.status == 304:
+                    self.stats["not_modified"] += 1
+                elif response.status == 200:
+                    body = await response.body()
+                    if self.is_cacheable_response(response.status, response.headers, body):
+                        await self.store(url, response.headers, body)
+                        self.stats["updated"] += 1
+                await response.dispose()
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 静态资源重新验证失败: {url}: {str(e)}")
+
+    async def close(self):
+        """等待后台重新验证完成（最多2秒）并持久化索引"""
+        if self.revalidate_tasks:
+            await asyncio.wait(list(self.revalidate_tasks), timeout=2)
+        await asyncio.get_running_loop().run_in_executor(None, self.save_index)
+
+    def get_report(self):
+        """汇总本次运行的缓存命中情况"""
+        report = dict(self.stats)
+        lookups = report["hits"] + report["misses"]
+        report["hit_rate"] = report["hits"] / lookups if lookups else 0
+        report["entries"] = len(self.index)
+        return report
+
+    def print_report(self):
+        report = self.get_report()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 静态资源缓存: 命中 {report['hits']}，未命中 {report['misses']}，命中率 {report['hit_rate'] * 100:.1f}%，从本地返回 {report['bytes_served'] / 1024 / 1024:.2f}MB，重新验证未变化 {report['not_modified']}，已更新 {report['updated']}，缓存条目 {report['entries']}")
@@ -2,174 +2,476 @@ import asyncio
 import time
 from datetime import datetime
 from playwright.async_api import async_playwright, TimeoutError
-from .server import TARGET_API_PATH
+from .server import MISSION_INFO_API_PATH, RESPONSE_SUCCESS, RESPONSE_TERMINAL, classify_receive_response
 from .logger import logger
+from .scheduler import StartScheduler
+from .dispatcher import ResponseDispatcher
+from .clicker import create_click_backend, DEFAULT_CLICK_BACKEND, DEFAULT_MAX_IN_FLIGHT
+
+# 页面就绪配置（毫秒）
+DEFAULT_PAGE_READY_TIMEOUT = 15000   # 等待任务信息接口和领取按钮的总超时
+PAGE_SELECTOR_MIN_TIMEOUT = 1000     # 任务信息接口超时后，检查领取按钮的最短时间
+PAGE_INFO_TIMEOUT = 3000             # 提取页面信息前等待文本元素的超时
+PRE_START_VERIFY_TIMEOUT = 1.0       # 开始前复查时页面必须在该时间（秒）内响应
+DEFAULT_HEDGE_THRESHOLD_MS = 8000    # 就绪耗时样本不足时的对冲阈值
+HEDGE_MIN_THRESHOLD_MS = 2000        # 对冲阈值下限，避免页面普遍很快时频繁对冲
+HEDGE_MIN_SAMPLES = 3                # 按p90计算对冲阈值所需的最少样本数
+HEDGE_SAMPLE_WINDOW = 20             # 计算对冲阈值时使用的最近就绪耗时样本数
+LOAD_RETRY_DELAY = 2                 # 页面加载失败后重试前的等待（秒）
+
+# 在页面内依次检查候选选择器，返回第一个已出现的选择器，配合wait_for_function在页面内轮询
+PROBE_SELECTORS_SCRIPT = '''(selectors) => {
+    for (const selector of selectors) {
+        try {
+            if (document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue) return selector;
+        } catch (e) {}
+    }
+    return null;
+}'''
+
+# 页面信息字段及其XPath，一次evaluate全部提取
+PAGE_INFO_FIELDS = {
+    "section_title": '//*[@id="app"]/div/div[3]/section[1]/p[1]',
+    "award_info": '//*[@id="app"]/div/div[3]/section[1]/p[2]'
+}
+EXTRACT_PAGE_INFO_SCRIPT = '''(fields) => {
+    const result = {};
+    let found = false;
+    for (const [name, selector] of Object.entries(fields)) {
+        const element = document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        result[name] = element ? element.textContent : null;
+        found = found || !!element;
+    }
+    return found ? result : null;
+}'''
+
+# 连接预热：插入preconnect提示，并以与领取请求相同的凭据模式请求一次接口域名，使连接在开始点击前已建立
+PREWARM_SCRIPT = '''([origin, url]) => {
+    for (const rel of ['dns-prefetch', 'preconnect']) {
+        const link = document.createElement('link');
+        link.rel = rel;
+        link.href = origin;
+        link.crossOrigin = 'use-credentials';
+        document.head.appendChild(link);
+    }
+    return fetch(url, {credentials: 'include'}).then(response => response.status, () => 0);
+}'''
+
+# 激活领取按钮并修改文本，页面加载和开始前复查共用
+ACTIVATE_BUTTON_SCRIPT = '''(selector) => {
+    const btn = document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!btn) return {success: false, message: '未找到按钮'};
+    btn.removeAttribute('disabled');
+    btn.classList.remove('disabled', 'disable');
+    btn.classList.add('active');
+    btn.style.pointerEvents = 'auto';
+    btn.style.opacity = '1';
+    btn.textContent = '关注ocean之下';
+    return {success: true, message: '按钮已激活并修改文本'};
+}'''
+
+# 连接已运行浏览器（需以 --remote-debugging-port 启动）的配置
+CDP_BROWSER_TYPE = "cdp"
+DEFAULT_CDP_ENDPOINT = "http://127.0.0.1:9222"
 
 class Browser:
-    def __init__(self, browser_type, browser_executable_path, cookies_dir):
+    def __init__(self, browser_type, browser_executable_path, cookies_dir, cdp_endpoint=None):
         self.browser_type = browser_type
         self.browser_executable_path = browser_executable_path
         self.cookies_dir = cookies_dir
+        self.cdp_endpoint = cdp_endpoint or DEFAULT_CDP_ENDPOINT
+        self.opened_pages = []
+        self.page_count_listener = None
+        self.scheduler = StartScheduler()
+        self.rate_controller = None
+        self.stop_signals = {}
+        self.receive_code_table = None
+        self.dispatcher = None
+        self.asset_cache = None
+        self.page_ready_timeout = DEFAULT_PAGE_READY_TIMEOUT
+        self.setup_timings = {}
+        self.hedge_enabled = True
+        self.hedge_default_threshold_ms = DEFAULT_HEDGE_THRESHOLD_MS
+        self.hedge_min_threshold_ms = HEDGE_MIN_THRESHOLD_MS
+        self.recent_ready_ms = []
+        self.hedge_stats = {"fired": 0, "won": 0, "skipped": 0}
+        self.selector_cache = None
+        self.task_selectors = {}
+        self.first_responses = {}
     
     async def setup_browser(self):
         """设置浏览器"""
         playwright = await async_playwright().start()
         return playwright
     
-    async def launch_browser(self, playwright):
-        """启动浏览器"""
-        launch_options = {
-            "user_data_dir": self.cookies_dir,
-            "headless": False,
-            "args": ["--disable-background-timer-throttling"]
-        }
-        
+    def get_launch_target(self, playwright, launch_options):
+        """根据浏览器类型选择Playwright的浏览器API，并补充启动选项"""
         # 如果指定了浏览器路径，则添加executable_path选项
         if self.browser_executable_path:
             launch_options["executable_path"] = self.browser_executable_path
         
         if self.browser_type == "firefox":
-            context = await playwright.firefox.launch_persistent_context(**launch_options)
-        elif self.browser_type == "chromium":
-            context = await playwright.chromium.launch_persistent_context(**launch_options)
+            return playwright.firefox
         elif self.browser_type == "webkit":
-            context = await playwright.webkit.launch_persistent_context(**launch_options)
-        elif self.browser_type == "chrome":
-            # 对于Chrome，我们使用chromium的API，但指定Chrome的路径
-            context = await playwright.chromium.launch_persistent_context(**launch_options)
+            return playwright.webkit
         elif self.browser_type == "msedge":
             # 对于Edge，我们使用chromium的API，但指定Edge的路径
             if not self.browser_executable_path:
                 launch_options["channel"] = "msedge"
-            context = await playwright.chromium.launch_persistent_context(**launch_options)
+            return playwright.chromium
         else:
-            # 默认使用chromium
-            context = await playwright.chromium.launch_persistent_context(**launch_options)
-        
-        return context
+            # chromium、chrome（使用chromium的API，但指定Chrome的路径）及默认情况
+            return playwright.chromium
+    
+    async def launch_browser(self, playwright, headless=False):
+        """启动浏览器（持久化上下文）"""
+        launch_options = {
+            "user_data_dir": self.cookies_dir,
+            "headless": headless,
+            "args": ["--disable-background-timer-throttling"]
+        }
+        target = self.get_launch_target(playwright, launch_options)
+        return await target.launch_persistent_context(**launch_options)
+    
+    async def launch_plain_browser(self, playwright):
+        """启动不带配置目录的浏览器，用于由导出的登录状态创建轻量上下文"""
+        launch_options = {
+            "headless": False,
+            "args": ["--disable-background-timer-throttling"]
+        }
+        target = self.get_launch_target(playwright, launch_options)
+        return await target.launch(**launch_options)
     
-    async def setup_task_page(self, context, base_url, task_id, selector, max_attempts, delay_before_load=0, running_flag=None):
-        """设置任务页面"""
+    async def connect_over_cdp(self, playwright):
+        """通过CDP连接已在运行的浏览器，返回(浏览器, 上下文)；优先复用其中已登录的默认上下文"""
+        cdp_browser = await playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+        context = cdp_browser.contexts[0] if cdp_browser.contexts else await cdp_browser.new_context()
+        return cdp_browser, context
+    
+    async def close_opened_pages(self):
+        """关闭本次运行打开的页面，不影响浏览器中原有的页面"""
+        for page in self.opened_pages:
+            if not page.is_closed():
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+        self.opened_pages = []
+    
+    async def open_storage_state_contexts(self, plain_browser, storage_state_path, count):
+        """由导出的登录状态创建多个相互独立的轻量上下文"""
+        return [await plain_browser.new_context(storage_state=storage_state_path) for _ in range(count)]
+    
+    async def setup_task_page(self, context, base_url, task_id, selector, max_attempts, delay_before_load=0, running_flag=None,
+                              semaphore=None):
+        """设置任务页面：每次尝试超过对冲阈值仍未就绪时并行加载第二个页面，先就绪的页面胜出；semaphore为页面加载并发信号量，对冲页面另占一个名额，没有空闲名额时不对冲"""
         if delay_before_load > 0:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 等待 {delay_before_load} 秒后加载页面")
             await asyncio.sleep(delay_before_load)
-        page = None
         try:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 开始加载页面，最大重试次数: {max_attempts}")
+            target_url = f"{base_url}?task_id={task_id}"
+            candidates = self.selector_cache.get_candidates(base_url, selector) if self.selector_cache else [selector]
             for attempt in range(1, max_attempts + 1):
                 if running_flag and not running_flag():
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 加载被用户终止")
                     return None, False
                 
-                if page:
-                    await page.close()
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 关闭之前的页面")
-                
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 第 {attempt}/{max_attempts} 次尝试加载页面")
-                page = await context.new_page()
-                await page.set_viewport_size({"width": 480, "height": 640})
-                target_url = f"{base_url}?task_id={task_id}"
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 访问URL: {target_url}")
-                
-                try:
-                    await page.goto(target_url)
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 页面导航成功")
-                    
-                    await page.wait_for_load_state("networkidle", timeout=30000)
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 页面加载完成")
-                    
-                    try:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 等待选择器出现: {selector}")
-                        await page.wait_for_selector(selector, timeout=15000)
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 选择器找到")
-                        
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 激活按钮并修改文本")
-                        activation_result = await page.evaluate('''(selector) => {
-                            const btn = document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-                            if (!btn) return {success: false, message: '未找到按钮'};
-                            btn.removeAttribute('disabled');
-                            btn.classList.remove('disabled', 'disable');
-                            btn.classList.add('active');
-                            btn.style.pointerEvents = 'auto';
-                            btn.style.opacity = '1';
-                            btn.textContent = '关注ocean之下';
-                            return {success: true, message: '按钮已激活并修改文本'};
-                        }''', selector)
-                        
-                        if activation_result['success']:
-                            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ✅ 页面设置成功")
-                            return page, True
-                        else:
-                            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ❌ 按钮激活失败: {activation_result['message']}")
-                    except TimeoutError:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ❌ 选择器超时")
-                    except Exception as e:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ❌ 页面操作失败: {str(e)}")
-                except Exception as e:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ❌ 页面导航失败: {str(e)}")
+                page, timings = await self.hedged_load(context, target_url, task_id, candidates, semaphore)
+                if page:
+                    self.task_selectors[task_id] = timings.pop("selector")
+                    if self.selector_cache:
+                        self.selector_cache.remember(base_url, self.task_selectors[task_id], candidates)
+                    timings["attempts"] = attempt
+                    self.setup_timings[task_id] = timings
+                    self.recent_ready_ms.append(timings["selector_ms"])
+                    del self.recent_ready_ms[:-HEDGE_SAMPLE_WINDOW]
+                    return page, True
                 
                 if attempt < max_attempts and (not running_flag or running_flag()):
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 等待 2 秒后重试")
-                    await asyncio.sleep(2)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 等待 {LOAD_RETRY_DELAY} 秒后重试")
+                    await asyncio.sleep(LOAD_RETRY_DELAY)
             
-            if page:
-                await page.close()
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 关闭页面")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ❌ 所有尝试均失败")
             return None, False
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ❌ 加载页面时发生错误: {str(e)}")
-            if page:
-                await page.close()
             return None, False
     
-    async def monitor_api_response(self, page, task_id, reward_result_cache):
-        """监控API响应并缓存结果"""
-        def handle_response(response):
-            if TARGET_API_PATH in response.url and response.request.method == "POST":
+    def get_hedge_threshold(self):
+        """对冲阈值（毫秒）：最近页面就绪耗时的p90，样本不足时使用默认值；未启用对冲时返回None"""
+        if not self.hedge_enabled:
+            return None
+        if len(self.recent_ready_ms) < HEDGE_MIN_SAMPLES:
+            threshold = self.hedge_default_threshold_ms
+        else:
+            samples = sorted(self.recent_ready_ms)
+            threshold = samples[min(len(samples) - 1, int(0.9 * len(samples)))]
+        return max(threshold, self.hedge_min_threshold_ms)
+    
+    async def hedged_load(self, context, target_url, task_id, candidates, semaphore=None):
+        """加载一次任务页面，超过对冲阈值未就绪时并行加载第二个页面，返回(先就绪的页面, 耗时)，另一个页面关闭"""
+        primary = asyncio.ensure_future(self.load_page_attempt(context, target_url, task_id, candidates))
+        attempts = [primary]
+        hedge = None
+        threshold = self.get_hedge_threshold()
+        if threshold is not None:
+            done, _ = await asyncio.wait([primary], timeout=threshold / 1000)
+            if not done and semaphore is not None and semaphore.locked():
+                # 不等待名额：名额可能都被同样卡住的主页面占着，等待会让主页面失败后的重试永远无法开始
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 页面 {threshold:.0f}ms 内未就绪，页面加载并发名额已满，跳过对冲")
+                self.hedge_stats["skipped"] += 1
+            elif not done:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 页面 {threshold:.0f}ms 内未就绪，并行加载对冲页面")
+                self.hedge_stats["fired"] += 1
+                if semaphore is not None:
+                    # 名额空闲时立即获得，对冲页面结束（含被取消）时归还
+                    await semaphore.acquire()
+                hedge = asyncio.ensure_future(self.load_page_attempt(context, target_url, task_id, candidates, True))
+                if semaphore is not None:
+                    hedge.add_done_callback(lambda _: semaphore.release())
+                attempts.append(hedge)
+        
+        winner = None
+        pending = set(attempts)
+        while pending and not winner:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((attempt for attempt in done if attempt.result()[0]), None)
+        for attempt in pending:
+            attempt.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        # 两个页面几乎同时就绪时，关闭没有胜出的那个
+        for attempt in attempts:
+            if attempt is not winner and not attempt.cancelled() and attempt.result()[0]:
+                await self.close_page(attempt.result()[0])
+        if not winner:
+            return None, None
+        if winner is hedge:
+            self.hedge_stats["won"] += 1
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 对冲页面先就绪")
+        return winner.result()
+    
+    def track_page(self, delta):
+        """通知页面数变化（含加载中的页面和对冲页面），用于统计同时打开的页面峰值"""
+        if self.page_count_listener:
+            self.page_count_listener(delta)
+    
+    async def close_page(self, page):
+        """关闭加载失败或未胜出的页面并更新页面计数，页面已关闭时忽略错误"""
+        self.track_page(-1)
+        try:
+            await page.close()
+        except Exception:
+            pass
+    
+    async def load_page_attempt(self, context, target_url, task_id, candidates, hedge=False):
+        """新建页面并加载到按钮激活，成功返回(页面, 耗时)，失败或被取消时关闭页面"""
+        label = f"任务 {task_id}{'（对冲页面）' if hedge else ''}"
+        page = None
+        ready = False
+        try:
+            page = await context.new_page()
+            self.opened_pages.append(page)
+            self.track_page(1)
+            await page.set_viewport_size({"width": 480, "height": 640})
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: 访问URL: {target_url}")
+            
+            try:
+                # 就绪条件：任务信息接口已响应且领取按钮已出现，不再等待networkidle
+                attempt_start = time.perf_counter()
+                info_waiter = asyncio.ensure_future(page.wait_for_response(
+                    lambda response: MISSION_INFO_API_PATH in response.url, timeout=self.page_ready_timeout
+                ))
+                try:
+                    await page.goto(target_url, wait_until="commit")
+                except BaseException:
+                    info_waiter.cancel()
+                    raise
+                navigation_ms = (time.perf_counter() - attempt_start) * 1000
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: 页面导航成功")
+                
+                try:
+                    await info_waiter
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: 任务信息接口已响应")
+                except TimeoutError:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ⚠️ 未等到任务信息接口响应，直接检查选择器")
+                info_ms = (time.perf_counter() - attempt_start) * 1000
+                
                 try:
-                    async def process_response():
-                        try:
-                            resp_json = await response.json()
-                            response_data = {
-                                "task_id": task_id,
-                                "status": "成功" if resp_json.get("code") == 0 else "失败",
-                                "response_code": resp_json.get("code"),
-                                "message": resp_json.get("message", ""),
-                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "device_name": self.get_device_name(),
-                                "url": response.url,
-                                "status_code": response.status
-                            }
-                            
-                            # 缓存结果
-                            reward_result_cache[task_id] = response_data
-                            
-                            # 保存到本地日志文件
-                            logger.save_api_response_to_log(task_id, response_data)
-                            
-                        except Exception as e:
-                            pass
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: 等待选择器出现: {candidates[0]}" + (f"（另有{len(candidates) - 1}个候选）" if len(candidates) > 1 else ""))
+                    # 与任务信息接口共用同一个超时预算
+                    selector_timeout = max(self.page_ready_timeout - info_ms, PAGE_SELECTOR_MIN_TIMEOUT)
+                    selector = await self.probe_selectors(page, candidates, selector_timeout)
+                    selector_ms = (time.perf_counter() - attempt_start) * 1000
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: 选择器找到" + (f": {selector}" if selector != candidates[0] else ""))
                     
-                    asyncio.create_task(process_response())
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: 激活按钮并修改文本")
+                    activation_result = await page.evaluate(ACTIVATE_BUTTON_SCRIPT, selector)
+                    
+                    if activation_result['success']:
+                        ready = True
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ✅ 页面设置成功（导航 {navigation_ms:.0f}ms，信息接口 {info_ms:.0f}ms，按钮就绪 {selector_ms:.0f}ms）")
+                        return page, {
+                            "selector": selector,
+                            "hedged": hedge,
+                            "navigation_ms": round(navigation_ms, 1),
+                            "info_ms": round(info_ms, 1),
+                            "selector_ms": round(selector_ms, 1)
+                        }
+                    else:
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ❌ 按钮激活失败: {activation_result['message']}")
+                except TimeoutError:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ❌ 选择器超时")
                 except Exception as e:
-                    pass
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ❌ 页面操作失败: {str(e)}")
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ❌ 页面导航失败: {str(e)}")
+            return None, None
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {label}: ❌ 加载页面时发生错误: {str(e)}")
+            return None, None
+        finally:
+            if page and not ready:
+                await self.close_page(page)
+    
+    async def probe_selectors(self, page, candidates, timeout):
+        """一次往返等待任意候选选择器出现，返回最靠前的已出现选择器，超时抛出TimeoutError"""
+        handle = await page.wait_for_function(PROBE_SELECTORS_SCRIPT, arg=candidates, timeout=timeout)
+        return await handle.json_value()
+    
+    async def prewarm_connection(self, page, origin, url, timeout):
+        """在页面内预热到接口域名的连接，返回(是否成功, 耗时毫秒)"""
+        prewarm_start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(page.evaluate(PREWARM_SCRIPT, [origin, url]), timeout)
+            return bool(status), (time.perf_counter() - prewarm_start) * 1000
+        except Exception:
+            return False, (time.perf_counter() - prewarm_start) * 1000
+    
+    async def verify_task_page(self, page, selector, timeout=PRE_START_VERIFY_TIMEOUT):
+        """开始前复查：确认按钮仍可解析并重新激活（SPA重新渲染会替换按钮元素），超时未返回说明页面无响应"""
+        try:
+            result = await asyncio.wait_for(page.evaluate(ACTIVATE_BUTTON_SCRIPT, selector), timeout)
+            return result['success'], result['message']
+        except asyncio.TimeoutError:
+            return False, "页面无响应"
+        except Exception as e:
+            return False, str(e)
+    
+    async def reload_task_page(self, page, selector, timeout_ms):
+        """原地重新加载任务页面并重新激活按钮，页面对象和已绑定的响应监控保持不变"""
+        reload_start = time.perf_counter()
+        try:
+            await page.reload(wait_until="commit", timeout=timeout_ms)
+            remaining_ms = timeout_ms - (time.perf_counter() - reload_start) * 1000
+            await page.wait_for_selector(selector, timeout=max(remaining_ms, 1))
+            result = await page.evaluate(ACTIVATE_BUTTON_SCRIPT, selector)
+            return result['success'], result['message']
+        except TimeoutError:
+            return False, "重新加载超时"
+        except Exception as e:
+            return False, f"重新加载失败: {str(e)}"
+    
+    async def install_response_dispatcher(self, context, reward_result_cache, dispatcher=None):
+        """在上下文上安装领取接口响应分发器，须在打开任务页面之前调用；传入已安装的分发器时直接复用"""
+        async def handle_report(task_id, report):
+            await self.process_receive_report(task_id, report, reward_result_cache)
+        
+        if dispatcher:
+            self.dispatcher = dispatcher
+            self.dispatcher.start(handle_report)
+            return
+        self.dispatcher = ResponseDispatcher(handle_report)
+        await self.dispatcher.install(context)
+    
+    async def attach_response_dispatcher(self, context):
+        """把已安装的分发器挂到另一个上下文，多个上下文的响应进入同一个队列"""
+        await self.dispatcher.attach(context)
+    
+    async def monitor_api_response(self, page, task_id, reward_result_cache):
+        """监控API响应并缓存结果：把页面登记到上下文级分发器"""
+        self.dispatcher.register_page(page, task_id)
+    
+    async def process_receive_report(self, task_id, report, reward_result_cache):
+        """处理一次领取接口响应"""
+        # 记录发出最早的一次领取请求的往返耗时，用于评估连接预热的效果
+        if report.get("started_at") is not None and report.get("elapsed") is not None:
+            first = self.first_responses.get(task_id)
+            if first is None or report["started_at"] < first["started_at"]:
+                self.first_responses[task_id] = {"started_at": report["started_at"], "elapsed_ms": report["elapsed"]}
+        resp_json = report.get("body") or {}
+        status_code = report.get("status")
+        category, reason = classify_receive_response(
+            resp_json.get("code"), resp_json.get("message", ""), status_code, self.receive_code_table
+        )
         
-        page.on("response", handle_response)
+        # 成功或终止类响应：立即结束该任务的点击
+        if category in (RESPONSE_SUCCESS, RESPONSE_TERMINAL):
+            self.signal_stop(task_id, reason)
+        
+        # 反馈给速率控制器
+        if self.rate_controller:
+            self.rate_controller.observe(task_id, category, resp_json.get("code"), status_code)
+        
+        # 被拦截时返回的通常不是JSON，不记录结果
+        if not resp_json:
+            return
+        response_data = {
+            "task_id": task_id,
+            "status": "成功" if resp_json.get("code") == 0 else "失败",
+            "response_code": resp_json.get("code"),
+            "response_category": category,
+            "message": resp_json.get("message", ""),
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "device_name": self.get_device_name(),
+            "url": report.get("url"),
+            "status_code": status_code
+        }
+        
+        # 缓存结果：已成功的结果不被之后在途请求的失败响应覆盖
+        cached = reward_result_cache.get(task_id)
+        if not cached or cached.get("response_code") != 0:
+            reward_result_cache[task_id] = response_data
+        
+        # 保存到本地日志文件
+        logger.save_api_response_to_log(task_id, response_data)
+    
+    def get_stop_signal(self, task_id):
+        """获取任务的提前停止信号"""
+        if task_id not in self.stop_signals:
+            self.stop_signals[task_id] = {"event": asyncio.Event(), "reason": None, "signal_time": None, "timestamp": None}
+        return self.stop_signals[task_id]
+    
+    def signal_stop(self, task_id, reason):
+        """通知任务立即结束点击，并把速率预算让给其余任务"""
+        signal = self.get_stop_signal(task_id)
+        if signal["event"].is_set():
+            return
+        signal["reason"] = reason
+        signal["signal_time"] = time.perf_counter()
+        signal["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        signal["event"].set()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 收到终止响应（{reason}），停止点击")
+        if self.rate_controller:
+            self.rate_controller.release_task(task_id)
     
     async def extract_page_info(self, page, task_id):
         """提取页面信息"""
         try:
-            # 等待页面加载完成
-            await page.wait_for_load_state('networkidle')
-            
-            # 提取第一个元素文本
-            element1 = await page.query_selector('//*[@id="app"]/div/div[3]/section[1]/p[1]')
-            text1 = await element1.text_content() if element1 else "未找到元素1"
-            
-            # 提取第二个元素文本
-            element2 = await page.query_selector('//*[@id="app"]/div/div[3]/section[1]/p[2]')
-            text2 = await element2.text_content() if element2 else "未找到元素2"
+            # 页面就绪时任务信息通常已渲染，一次evaluate取回所有字段；还未渲染时在页面内短暂轮询
+            texts = await page.evaluate(EXTRACT_PAGE_INFO_SCRIPT, PAGE_INFO_FIELDS)
+            if texts is None:
+                try:
+                    handle = await page.wait_for_function(EXTRACT_PAGE_INFO_SCRIPT, arg=PAGE_INFO_FIELDS, timeout=PAGE_INFO_TIMEOUT)
+                    texts = await handle.json_value()
+                except TimeoutError:
+                    texts = {}
+            text1 = texts.get("section_title")
+            text1 = text1 if text1 is not None else "未找到元素1"
+            text2 = texts.get("award_info")
+            text2 = text2 if text2 is not None else "未找到元素2"
             
             # 构建页面信息
             page_info_data = {
@@ -184,68 +486,51 @@ class Browser:
         except Exception as e:
             return None
     
-    async def wait_for_start_time(self, start_time, running_flag=None):
-        """等待开始时间"""
-        last_log_time = 0
-        while datetime.now() < start_time and (not running_flag or running_flag()):
-            remaining = (start_time - datetime.now()).total_seconds()
-            current_time = time.time()
-            
-            # 每1秒输出一次日志
-            if current_time - last_log_time >= 1 and remaining > 0:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 等待开始时间，剩余: {remaining:.2f}秒")
-                last_log_time = current_time
-            
-            # 当剩余时间少于5秒时，每0.5秒输出一次日志
-            elif remaining < 5 and remaining > 0 and current_time - last_log_time >= 0.5:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 即将开始，剩余: {remaining:.2f}秒")
-                last_log_time = current_time
-            
-            await asyncio.sleep(0.1)
+    async def wait_for_start_time(self, start_time, running_flag=None, task_id=None):
+        """等待开始时间，返回释放误差（毫秒）"""
+        return await self.scheduler.wait(task_id, start_time, running_flag)
     
-    async def perform_task_clicks(self, page, task_id, target_selector, interval, duration, results, running_flag=None):
-        """执行任务点击"""
-        click_count = 0
-        success_count = 0
-        fail_count = 0
-        end_time = time.perf_counter() + duration
-        start_time = datetime.now()
-        
+    async def perform_task_clicks(self, page, task_id, target_selector, interval, duration, results, running_flag=None, click_backend=DEFAULT_CLICK_BACKEND, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """执行任务点击，返回点击统计"""
         print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始执行点击任务: {task_id}")
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] 点击参数: 持续时间={duration}s, 间隔={interval}s, 选择器={target_selector}")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 点击参数: 持续时间={duration}s, 间隔={interval}s, 选择器={target_selector}, 点击后端={click_backend}, 最大并发={max_in_flight}")
         
-        last_log_time = 0
-        while time.perf_counter() < end_time and (not running_flag or running_flag()):
-            try:
-                await page.click(target_selector, timeout=50)
-                success_count += 1
-            except Exception as e:
-                fail_count += 1
-                # 每10次失败输出一次日志
-                if fail_count % 10 == 0:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 已失败 {fail_count} 次")
-            click_count += 1
-            
-            # 每100次点击输出一次日志
-            if click_count % 100 == 0:
-                elapsed = time.perf_counter() - (end_time - duration)
-                rate = click_count / elapsed if elapsed > 0 else 0
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 已点击 {click_count} 次，成功 {success_count} 次，速率: {rate:.2f}次/秒")
-            
-            if interval > 0 and (not running_flag or running_flag()):
-                await asyncio.sleep(interval)
+        backend = create_click_backend(click_backend, page, target_selector, self.browser_type)
+        try:
+            await backend.prepare()
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ⚠️ 点击后端 {backend.name} 准备失败: {str(e)}，使用 {DEFAULT_CLICK_BACKEND}")
+            await backend.close()
+            backend = create_click_backend(DEFAULT_CLICK_BACKEND, page, target_selector, self.browser_type)
+            await backend.prepare()
+        
+        if self.rate_controller and task_id in self.rate_controller.intervals:
+            backend.interval_provider = lambda: self.rate_controller.get_interval(task_id)
+        stop_signal = self.get_stop_signal(task_id)
+        backend.stop_event = stop_signal["event"]
+        
+        try:
+            stats = await backend.run(task_id, interval, duration, running_flag, max_in_flight)
+        finally:
+            await backend.close()
+        
+        if stop_signal["event"].is_set():
+            stats["stop_reason"] = stop_signal["reason"]
+            stats["stop_time"] = stop_signal["timestamp"]
+            stats["stop_latency_ms"] = (time.perf_counter() - stop_signal["signal_time"]) * 1000
         
-        # 计算实际执行时间
-        actual_duration = (datetime.now() - start_time).total_seconds()
         # 计算成功率
-        success_rate = (success_count / click_count * 100) if click_count > 0 else 0
-        # 计算点击速率
-        click_rate = (click_count / actual_duration) if actual_duration > 0 else 0
+        success_rate = (stats["success_count"] / stats["click_count"] * 100) if stats["click_count"] > 0 else 0
         
-        result = f"{actual_duration:.2f}秒点击结束，共点击 {click_count} 次，成功 {success_count} 次，成功率 {success_rate:.1f}%，速率 {click_rate:.2f}次/秒"
+        if "stop_reason" in stats:
+            result = f"收到终止响应（{stats['stop_reason']}）提前结束，生效耗时 {stats['stop_latency_ms']:.1f}ms，"
+        else:
+            result = ""
+        result += f"{stats['elapsed']:.2f}秒点击结束，共点击 {stats['click_count']} 次，成功 {stats['success_count']} 次，成功率 {success_rate:.1f}%，速率 {stats['click_rate']:.2f}次/秒，后端 {stats['backend']}，平均派发延迟 {stats['latency_avg_ms']:.2f}ms，实际间隔 {stats['achieved_interval_ms']:.1f}ms"
         print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: {result}")
         
         results[task_id] = (True, result)
+        return stats
     
     def get_device_name(self):
         """获取设备名称"""
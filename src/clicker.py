@@ -0,0 +1,324 @@
+import asyncio
+import time
+from datetime import datetime
+
+# 点击后端配置
+DEFAULT_CLICK_BACKEND = "page_click"
+DEFAULT_MAX_IN_FLIGHT = 1  # 1表示串行点击，大于1时启用流水线模式
+CLICK_TIMEOUT_MS = 50
+CLICK_REPORT_BINDING = "__biliClickReport"
+
+class ClickBackend:
+    """点击后端基类：子类实现单次点击，基类负责节奏控制和统计"""
+    name = ""
+
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+        self.click_count = 0
+        self.success_count = 0
+        self.fail_count = 0
+        self.latencies = []
+        # 返回当前点击间隔的回调，由速率控制器提供；为None时使用固定间隔
+        self.interval_provider = None
+        # 提前停止信号：领取接口返回成功或终止类响应时置位
+        self.stop_event = None
+
+    def current_interval(self, interval):
+        """获取当前点击间隔"""
+        return self.interval_provider() if self.interval_provider else interval
+
+    def should_continue(self, end_time, running_flag=None):
+        """是否继续点击：未到结束时间、未被用户终止且未收到提前停止信号"""
+        if self.stop_event and self.stop_event.is_set():
+            return False
+        return time.perf_counter() < end_time and (not running_flag or running_flag())
+
+    async def pause(self, seconds):
+        """等待指定时间，收到提前停止信号时立即返回"""
+        if not self.stop_event:
+            await asyncio.sleep(seconds)
+            return
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def prepare(self):
+        """点击开始前的准备工作"""
+        pass
+
+    async def click(self):
+        """执行一次点击"""
+        raise NotImplementedError
+
+    async def close(self):
+        """释放后端占用的资源"""
+        pass
+
+    async def timed_click(self):
+        """执行一次点击并记录派发延迟，返回是否成功"""
+        started = time.perf_counter()
+        try:
+            await self.click()
+            self.success_count += 1
+            return True
+        except Exception:
+            self.fail_count += 1
+            return False
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+            self.click_count += 1
+
+    def log_progress(self, task_id, success, loop_start):
+        """每10次失败、每100次点击输出一次日志"""
+        if not success and self.fail_count % 10 == 0:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 已失败 {self.fail_count} 次")
+
+        if self.click_count % 100 == 0:
+            elapsed = time.perf_counter() - loop_start
+            rate = self.click_count / elapsed if elapsed > 0 else 0
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 已点击 {self.click_count} 次，成功 {self.success_count} 次，速率: {rate:.2f}次/秒")
+
+    async def run(self, task_id, interval, duration, running_flag=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """按间隔串行点击，直到持续时间结束；max_in_flight大于1时改用流水线模式"""
+        if max_in_flight > 1:
+            return await self.run_pipelined(task_id, interval, duration, max_in_flight, running_flag)
+
+        loop_start = time.perf_counter()
+        end_time = loop_start + duration
+
+        while self.should_continue(end_time, running_flag):
+            success = await self.timed_click()
+            self.log_progress(task_id, success, loop_start)
+
+            current_interval = self.current_interval(interval)
+            if current_interval > 0 and self.should_continue(end_time, running_flag):
+                await self.pause(current_interval)
+
+        return self.get_stats(time.perf_counter() - loop_start)
+
+    async def run_pipelined(self, task_id, interval, duration, max_in_flight, running_flag=None):
+        """按固定速率节拍派发点击，每个页面最多保持max_in_flight个未完成的点击"""
+        loop_start = time.perf_counter()
+        end_time = loop_start + duration
+        slots = asyncio.Semaphore(max_in_flight)
+        in_flight = set()
+        next_tick = loop_start
+        self.skipped_ticks = 0
+
+        def on_done(task):
+            in_flight.discard(task)
+            slots.release()
+            if not task.cancelled():
+                self.log_progress(task_id, task.result(), loop_start)
+
+        while next_tick < end_time and self.should_continue(end_time, running_flag):
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                await self.pause(delay)
+            await slots.acquire()
+            if not self.should_continue(end_time, running_flag):
+                slots.release()
+                break
+
+            task = asyncio.create_task(self.timed_click())
+            in_flight.add(task)
+            task.add_done_callback(on_done)
+
+            # 节拍按绝对时间推进，落后超过一个节拍时丢弃错过的节拍，避免突发
+            current_interval = self.current_interval(interval)
+            next_tick += current_interval
+            lag = time.perf_counter() - next_tick
+            if current_interval > 0 and lag > current_interval:
+                missed = int(lag / current_interval)
+                next_tick += missed * current_interval
+                self.skipped_ticks += missed
+
+        # 停止派发后等待所有未完成的点击结束，保证成功/失败计数准确
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+        stats = self.get_stats(time.perf_counter() - loop_start)
+        stats["max_in_flight"] = max_in_flight
+        stats["skipped_ticks"] = self.skipped_ticks
+        return stats
+
+    def get_stats(self, elapsed):
+        """汇总点击统计"""
+        latencies = self.latencies
+        return {
+            "backend": self.name,
+            "click_count": self.click_count,
+            "success_count": self.success_count,
+            "fail_count": self.fail_count,
+            "elapsed": elapsed,
+            "click_rate": self.click_count / elapsed if elapsed > 0 else 0,
+            "achieved_interval_ms": elapsed / self.click_count * 1000 if self.click_count else 0,
+            "latency_avg_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0,
+            "latency_max_ms": max(latencies) * 1000 if latencies else 0
+        }
+
+class PageClickBackend(ClickBackend):
+    """Playwright page.click：每次点击都做完整的可操作性检查"""
+    name = "page_click"
+
+    async def click(self):
+        await self.page.click(self.selector, timeout=CLICK_TIMEOUT_MS)
+
+class DispatchEventBackend(ClickBackend):
+    """基于locator的dispatch_event：跳过可操作性检查，直接派发click事件"""
+    name = "dispatch_event"
+
+    async def prepare(self):
+        self.locator = self.page.locator(self.selector)
+
+    async def click(self):
+        await self.locator.dispatch_event("click", timeout=CLICK_TIMEOUT_MS)
+
+class InPageLoopBackend(ClickBackend):
+    """页面内注入的JavaScript点击循环，通过暴露的binding回报点击次数"""
+    name = "in_page"
+
+    async def prepare(self):
+        self.report = {}
+
+        def handle_report(source, report):
+            self.report = report
+
+        # 同一页面上binding不能重复注册，每个后端实例使用独立名称
+        self.binding = f"{CLICK_REPORT_BINDING}_{id(self)}"
+        await self.page.expose_binding(self.binding, handle_report)
+
+    async def run(self, task_id, interval, duration, running_flag=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        # 点击在页面内同步执行，没有IPC往返，不需要流水线
+        loop_start = time.perf_counter()
+        loop_task = asyncio.create_task(self.page.evaluate('''([selector, interval, duration, binding]) => {
+            const find = () => document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            const start = performance.now();
+            const stats = {clicks: 0, success: 0, fail: 0, latency: 0, latency_max: 0, done: false};
+            window.__biliClickStop = false;
+            window.__biliClickInterval = interval;
+            return new Promise(resolve => {
+                let next = start;
+                const tick = () => {
+                    const now = performance.now();
+                    if (window.__biliClickStop || now - start >= duration) {
+                        stats.done = true;
+                        stats.elapsed = now - start;
+                        window[binding](stats);
+                        resolve(stats);
+                        return;
+                    }
+                    const clickStart = performance.now();
+                    const btn = find();
+                    if (btn) {
+                        btn.click();
+                        stats.success++;
+                    } else {
+                        stats.fail++;
+                    }
+                    const latency = performance.now() - clickStart;
+                    stats.latency += latency;
+                    stats.latency_max = Math.max(stats.latency_max, latency);
+                    stats.clicks++;
+                    if (stats.clicks % 100 === 0) window[binding](stats);
+                    // 间隔可由Python端随时调整，按绝对时间排下一次点击
+                    next = Math.max(next + window.__biliClickInterval, performance.now());
+                    setTimeout(tick, Math.max(next - performance.now(), 0));
+                };
+                tick();
+            });
+        }''', [self.selector, interval * 1000, duration * 1000, self.binding]))
+
+        last_logged = 0
+        pushed_interval = interval
+        while not loop_task.done():
+            if (running_flag and not running_flag()) or (self.stop_event and self.stop_event.is_set()):
+                try:
+                    await self.page.evaluate("() => { window.__biliClickStop = true; }")
+                except Exception:
+                    pass
+                break
+            current_interval = self.current_interval(interval)
+            if current_interval != pushed_interval:
+                try:
+                    await self.page.evaluate("(value) => { window.__biliClickInterval = value; }", current_interval * 1000)
+                    pushed_interval = current_interval
+                except Exception:
+                    pass
+            clicks = self.report.get("clicks", 0)
+            if clicks - last_logged >= 100:
+                elapsed = time.perf_counter() - loop_start
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 已点击 {clicks} 次，成功 {self.report.get('success', 0)} 次，速率: {clicks / elapsed:.2f}次/秒")
+                last_logged = clicks
+            waiters = {loop_task}
+            if self.stop_event:
+                stop_waiter = asyncio.ensure_future(self.stop_event.wait())
+                waiters.add(stop_waiter)
+            await asyncio.wait(waiters, timeout=0.5, return_when=asyncio.FIRST_COMPLETED)
+            if self.stop_event:
+                stop_waiter.cancel()
+
+        try:
+            report = await loop_task
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 页面内点击循环异常: {str(e)}")
+            report = self.report
+
+        self.click_count = report.get("clicks", 0)
+        self.success_count = report.get("success", 0)
+        self.fail_count = report.get("fail", 0)
+        stats = self.get_stats(time.perf_counter() - loop_start)
+        stats["latency_avg_ms"] = report.get("latency", 0) / self.click_count if self.click_count else 0
+        stats["latency_max_ms"] = report.get("latency_max", 0)
+        return stats
+
+class CDPMouseBackend(ClickBackend):
+    """CDP Input.dispatchMouseEvent：在缓存的按钮坐标上直接派发鼠标事件（仅Chromium系浏览器）"""
+    name = "cdp_mouse"
+
+    async def prepare(self):
+        self.session = await self.page.context.new_cdp_session(self.page)
+        await self.locate()
+
+    async def locate(self):
+        """滚动到按钮并缓存其中心坐标"""
+        locator = self.page.locator(self.selector)
+        await locator.scroll_into_view_if_needed(timeout=1000)
+        box = await locator.bounding_box(timeout=1000)
+        if not box:
+            raise RuntimeError("无法获取按钮坐标")
+        self.x = box["x"] + box["width"] / 2
+        self.y = box["y"] + box["height"] / 2
+
+    async def click(self):
+        event = {"x": self.x, "y": self.y, "button": "left", "clickCount": 1}
+        await asyncio.gather(
+            self.session.send("Input.dispatchMouseEvent", {"type": "mousePressed", **event}),
+            self.session.send("Input.dispatchMouseEvent", {"type": "mouseReleased", **event})
+        )
+
+    async def close(self):
+        try:
+            await self.session.detach()
+        except Exception:
+            pass
+
+CLICK_BACKENDS = {
+    PageClickBackend.name: PageClickBackend,
+    DispatchEventBackend.name: DispatchEventBackend,
+    InPageLoopBackend.name: InPageLoopBackend,
+    CDPMouseBackend.name: CDPMouseBackend
+}
+
+def create_click_backend(name, page, selector, browser_type="chromium"):
+    """按名称创建点击后端，不可用时回退到page.click"""
+    backend_class = CLICK_BACKENDS.get(name)
+    if backend_class is None:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 未知的点击后端 {name}，使用 {DEFAULT_CLICK_BACKEND}")
+        backend_class = CLICK_BACKENDS[DEFAULT_CLICK_BACKEND]
+    elif backend_class is CDPMouseBackend and browser_type in ("firefox", "webkit"):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ {browser_type} 不支持CDP点击，使用 {DEFAULT_CLICK_BACKEND}")
+        backend_class = CLICK_BACKENDS[DEFAULT_CLICK_BACKEND]
+    return backend_class(page, selector)
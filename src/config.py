@@ -182,6 +182,26 @@ class ConfigManager:
             return os.path.normpath(os.path.join(self.get_exe_directory(), server_cookies))
         
         return os.path.normpath(os.path.join(self.get_exe_directory(), DEFAULT_COOKIES_DIR))
+    
+    def resolve_local_path(self, path):
+        """相对路径按程序目录解析"""
+        if not path or os.path.isabs(path):
+            return path
+        return os.path.normpath(os.path.join(self.get_exe_directory(), path))
+    
+    def get_accounts(self):
+        """获取多账号配置：每个账号有独立的Cookie目录（默认为 Cookie目录_账号名）和可选的登录状态文件，配置了登录状态文件时默认使用storage_state模式"""
+        accounts = []
+        for index, account in enumerate(self.client_config.get("accounts") or []):
+            name = str(account.get("name") or f"account{index + 1}")
+            storage_state = self.resolve_local_path(account.get("storage_state"))
+            accounts.append({
+                "name": name,
+                "cookies_dir": self.resolve_local_path(account.get("cookies_dir")) or f"{self.get_cookies_dir()}_{name}",
+                "storage_state": storage_state,
+                "context_mode": account.get("context_mode") or ("storage_state" if storage_state else None)
+            })
+        return accounts
 
 # 全局配置管理器实例
 config_manager = ConfigManager()
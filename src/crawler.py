@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from .utils import utils
+from .browser import Browser, CDP_BROWSER_TYPE, PAGE_INFO_FIELDS, EXTRACT_PAGE_INFO_SCRIPT
+from .server import Server, MISSION_INFO_API_PATH, RECEIVE_CODE_TABLE, RESPONSE_THROTTLED
+from .routing import RouteRules
+
+# 任务信息抓取配置
+DEFAULT_MISSION_INFO_API_URL = f"https://api.bilibili.com{MISSION_INFO_API_PATH}"
+DEFAULT_API_CONCURRENCY = 4             # 同时进行的任务信息接口请求数
+DEFAULT_PAGE_POOL_SIZE = 2              # 接口不可用时循环复用的页面数
+DEFAULT_UPLOAD_BATCH_SIZE = 50          # 每批上传的页面信息条数
+CRAWL_API_TIMEOUT = 10000               # 任务信息接口请求超时（毫秒）
+CRAWL_PAGE_TIMEOUT = 15000              # 页面回退时等待任务信息接口响应的超时（毫秒）
+CRAWL_RESULTS_FILE_NAME = "crawl_results.json"
+# 提示信息中出现这些关键字时判定为已过期的任务，其余非0业务码判定为无效任务
+EXPIRED_MESSAGE_KEYWORDS = ("已结束", "已过期", "已下线")
+# 这些业务码说明接口暂时不可用（未登录或被限流），改由页面加载
+FALLBACK_CODES = {-101} | {code for code, (category, _) in RECEIVE_CODE_TABLE.items() if category == RESPONSE_THROTTLED}
+
+class TaskInfoCrawler:
+    """任务信息抓取模式：只读取任务信息、从不点击，优先直接请求任务信息接口，接口不可用时用少量循环复用的页面加载，有效任务批量上传"""
+
+    def __init__(self, api_url=DEFAULT_MISSION_INFO_API_URL, api_concurrency=DEFAULT_API_CONCURRENCY,
+                 page_pool_size=DEFAULT_PAGE_POOL_SIZE, upload_batch_size=DEFAULT_UPLOAD_BATCH_SIZE):
+        self.api_url = api_url
+        self.api_concurrency = max(1, int(api_concurrency))
+        self.page_pool_size = max(1, int(page_pool_size))
+        self.upload_batch_size = max(1, int(upload_batch_size))
+        self.results = {}
+        self.pending_uploads = []
+        self.upload_stats = {"uploaded": 0, "unchanged": 0, "failed": 0}
+        self.page_pool = None
+        self.pool_pages = []
+        self.route_rules = None
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的crawl配置创建抓取器"""
+        return cls(
+            api_url=config.get("api_url", DEFAULT_MISSION_INFO_API_URL),
+            api_concurrency=config.get("api_concurrency", DEFAULT_API_CONCURRENCY),
+            page_pool_size=config.get("page_pool_size", DEFAULT_PAGE_POOL_SIZE),
+            upload_batch_size=config.get("upload_batch_size", DEFAULT_UPLOAD_BATCH_SIZE)
+        )
+
+    @staticmethod
+    def parse_mission_info(task_id, payload):
+        """解析任务信息接口响应，返回任务记录；接口暂时不可用或数据不完整时返回None，由页面回退处理"""
+        code = payload.get("code")
+        message = payload.get("message") or payload.get("msg") or ""
+        if code != 0:
+            if code in FALLBACK_CODES:
+                return None
+            status = "expired" if any(keyword in message for keyword in EXPIRED_MESSAGE_KEYWORDS) else "invalid"
+            return {"task_id": task_id, "status": status, "message": f"code={code} {message}".strip()}
+
+        data = payload.get("data") or {}
+        task_name = data.get("task_name") or ""
+        if not task_name:
+            return None
+        award_name = (data.get("reward_info") or {}).get("award_name") or ""
+        # 与页面显示及油猴客户端一致：标题为活动名，奖励为奖品名，缺失时用任务名
+        return {
+            "task_id": task_id,
+            "status": "valid",
+            "section_title": data.get("act_name") or task_name,
+            "award_info": award_name or task_name
+        }
+
+    async def fetch_via_api(self, request_context, task_id, referer):
+        """直接请求任务信息接口（带浏览器上下文的Cookie），失败返回None"""
+        try:
+            response = await request_context.get(self.api_url, params={"task_id": task_id},
+                                                 headers={"Referer": referer}, timeout=CRAWL_API_TIMEOUT)
+            try:
+                if not response.ok:
+                    return None
+                return self.parse_mission_info(task_id, await response.json())
+            finally:
+                await response.dispose()
+        except Exception:
+            return None
+
+    async def acquire_page(self, browser, context):
+        """从页面池取出页面，池未满时新建；新页面登记到浏览器的本次运行页面中，结束时统一关闭"""
+        if self.page_pool.empty() and len(self.pool_pages) < self.page_pool_size:
+            # 先占位，避免并发新建的页面超过池大小
+            self.pool_pages.append(None)
+            try:
+                page = await context.new_page()
+            except BaseException:
+                self.pool_pages.pop()
+                raise
+            self.pool_pages[-1] = page
+            browser.opened_pages.append(page)
+            if self.route_rules:
+                # 路由只注册在抓取自己的页面上，不影响共用上下文中的其他页面
+                await self.route_rules.install(page)
+            return page
+        return await self.page_pool.get()
+
+    async def fetch_via_page(self, browser, context, task_id, base_url):
+        """页面回退：在复用的页面中打开任务页，读取任务信息接口响应，读不到时从页面文本提取"""
+        page = None
+        try:
+            page = await self.acquire_page(browser, context)
+            info_waiter = asyncio.ensure_future(page.wait_for_response(
+                lambda response: MISSION_INFO_API_PATH in response.url, timeout=CRAWL_PAGE_TIMEOUT
+            ))
+            try:
+                await page.goto(f"{base_url}?task_id={task_id}", wait_until="commit")
+            except Exception:
+                info_waiter.cancel()
+                raise
+            try:
+                response = await info_waiter
+                record = self.parse_mission_info(task_id, await response.json())
+                if record:
+                    return record
+            except Exception:
+                pass
+
+            texts = await page.evaluate(EXTRACT_PAGE_INFO_SCRIPT, PAGE_INFO_FIELDS)
+            if texts and texts.get("section_title"):
+                return {
+                    "task_id": task_id,
+                    "status": "valid",
+                    "section_title": texts["section_title"].strip(),
+                    "award_info": (texts.get("award_info") or "").strip()
+                }
+            return {"task_id": task_id, "status": "failed", "message": "接口和页面均未取到任务信息"}
+        except Exception as e:
+            return {"task_id": task_id, "status": "failed", "message": f"页面加载失败: {str(e)}"}
+        finally:
+            if page:
+                self.page_pool.put_nowait(page)
+
+    async def crawl_one(self, browser, context, server, task_id, base_url, semaphore, running_flag):
+        if not running_flag():
+            return
+        async with semaphore:
+            record = await self.fetch_via_api(context.request, task_id, base_url)
+        source = "api"
+        if record is None and running_flag():
+            source = "page"
+            record = await self.fetch_via_page(browser, context, task_id, base_url)
+        if record is None:
+            return
+
+        record["source"] = source
+        record["crawl_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.results[task_id] = record
+        if record["status"] == "valid":
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ {task_id}: {record['section_title']} [{record['award_info']}]（{'接口' if source == 'api' else '页面'}）")
+            self.pending_uploads.append({
+                "task_id": task_id,
+                "device_name": utils.get_windows_device_name(),
+                "section_title": record["section_title"],
+                "award_info": record["award_info"],
+                "extract_time": record["crawl_time"]
+            })
+            if len(self.pending_uploads) >= self.upload_batch_size:
+                await self.flush_uploads(server)
+        else:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ {task_id}: {record['status']} - {record.get('message', '')}")
+
+    async def flush_uploads(self, server):
+        """上传积累的有效任务信息"""
+        batch, self.pending_uploads = self.pending_uploads, []
+        if not batch:
+            return
+        success, uploaded_count, message = await asyncio.get_running_loop().run_in_executor(None, server.batch_upload_page_info, batch)
+        if success:
+            self.upload_stats["uploaded"] += uploaded_count
+            self.upload_stats["unchanged"] += len(batch) - uploaded_count
+        else:
+            self.upload_stats["failed"] += len(batch)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {'✅' if success else '❌'} {message}")
+
+    async def crawl(self, browser_type, browser_executable_path, cookies_dir, server_url, task_ids, running_flag, runtime=None):
+        """抓取任务信息，返回(成功, 消息)"""
+        from .config import config_manager
+
+        task_ids = list(dict.fromkeys(str(task_id) for task_id in task_ids))
+        if not task_ids:
+            return False, "没有需要抓取的TaskID"
+        self.results = {}
+        self.pending_uploads = []
+        self.upload_stats = {"uploaded": 0, "unchanged": 0, "failed": 0}
+        self.page_pool = asyncio.Queue()
+        self.pool_pages = []
+        self.route_rules = None
+        crawl_start = time.perf_counter()
+        browser = Browser(browser_type, browser_executable_path, cookies_dir, config_manager.browser_config.get("cdp_endpoint"))
+        try:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始抓取任务信息，共{len(task_ids)}个TaskID（只读取，不点击）")
+            if runtime:
+                context, _ = await runtime.acquire(browser_type, browser_executable_path, cookies_dir, browser.cdp_endpoint)
+            else:
+                playwright = await browser.setup_browser()
+                if browser_type == CDP_BROWSER_TYPE:
+                    cdp_browser, context = await browser.connect_over_cdp(playwright)
+                else:
+                    context = await browser.launch_browser(playwright, headless=True)
+
+            # 回退页面只需要任务信息，在回退页面上拦截图片、字体等资源
+            route_rules_config = config_manager.server_config.get("route_rules", {})
+            if route_rules_config.get("enabled", False):
+                self.route_rules = RouteRules.from_config(route_rules_config)
+
+            server = Server(server_url)
+            base_url = config_manager.server_config.get("reward_base_url", "https://www.bilibili.com/blackboard/era-award-exchange.html")
+            semaphore = asyncio.Semaphore(self.api_concurrency)
+            crawl_results = await asyncio.gather(
+                *(self.crawl_one(browser, context, server, task_id, base_url, semaphore, running_flag) for task_id in task_ids),
+                return_exceptions=True
+            )
+            for task_id, result in zip(task_ids, crawl_results):
+                if isinstance(result, Exception):
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ {task_id}: 抓取出错: {str(result)}")
+            await self.flush_uploads(server)
+            await asyncio.get_running_loop().run_in_executor(None, server.save_page_info_cache)
+
+            elapsed = time.perf_counter() - crawl_start
+            statuses = [record["status"] for record in self.results.values()]
+            sources = [record["source"] for record in self.results.values()]
+            rate = len(self.results) / elapsed * 60 if elapsed > 0 else 0
+            self.save_results()
+            if not running_flag():
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 抓取被用户终止")
+            message = (f"抓取完成: {len(self.results)}/{len(task_ids)}个TaskID，有效 {statuses.count('valid')}，"
+                       f"无效 {statuses.count('invalid')}，已过期 {statuses.count('expired')}，失败 {statuses.count('failed')}；"
+                       f"接口 {sources.count('api')}，页面回退 {sources.count('page')}；"
+                       f"上传 {self.upload_stats['uploaded']}，未变化 {self.upload_stats['unchanged']}，上传失败 {self.upload_stats['failed']}；"
+                       f"耗时 {elapsed:.1f}秒，{rate:.1f}个/分钟")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+            return True, message
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 抓取任务信息出错: {str(e)}")
+            return False, f"抓取任务信息出错: {str(e)}"
+        finally:
+            if runtime:
+                # 常驻运行时：按运行时的释放流程只关闭本次打开的页面，上下文留给下次运行
+                try:
+                    await runtime.release(browser)
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 释放浏览器运行时失败: {str(e)}")
+            else:
+                try:
+                    await browser.close_opened_pages()
+                    if 'cdp_browser' in locals():
+                        await cdp_browser.close()
+                    elif 'context' in locals():
+                        await context.close()
+                    if 'playwright' in locals():
+                        await playwright.stop()
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 关闭浏览器失败: {str(e)}")
+
+    def save_results(self):
+        """把本次抓取结果（含无效、已过期的TaskID）保存到本地，便于整理服务端任务列表"""
+        try:
+            path = os.path.join(utils.get_exe_directory(), CRAWL_RESULTS_FILE_NAME)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.results, f, ensure_ascii=False, indent=2)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 抓取结果已保存: {path}")
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 抓取结果保存失败: {str(e)}")
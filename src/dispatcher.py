@@ -0,0 +1,128 @@
+import asyncio
+import json
+from datetime import datetime
+from .server import TARGET_API_PATH
+
+# 响应分发配置
+RECEIVE_REPORT_BINDING = "__biliReceiveReport"
+DISPATCH_QUEUE_SIZE = 256
+
+# 注入页面的fetch/XHR钩子：只有领取接口的POST响应才通过binding回传
+RECEIVE_HOOK_SCRIPT = '''(() => {
+    const targetPath = %(target_path)s;
+    const binding = %(binding)s;
+    if (window.__biliReceiveHooked) return;
+    window.__biliReceiveHooked = true;
+
+    const report = (url, status, text, started) => {
+        let body = null;
+        try { body = JSON.parse(text); } catch (e) {}
+        const fn = window[binding];
+        if (fn) fn({url: String(url), status: status, body: body, elapsed: performance.now() - started, started_at: performance.timeOrigin + started});
+    };
+    const matches = (url, method) => String(url).includes(targetPath) && String(method || 'GET').toUpperCase() === 'POST';
+
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function(input, init) {
+            const url = typeof input === 'string' ? input : (input && input.url);
+            const method = (init && init.method) || (input && input.method);
+            const promise = originalFetch.apply(this, arguments);
+            if (!matches(url, method)) return promise;
+            const started = performance.now();
+            return promise.then(response => {
+                response.clone().text().then(text => report(response.url || url, response.status, text, started), () => {});
+                return response;
+            });
+        };
+    }
+
+    const originalOpen = XMLHttpRequest.prototype.open;
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function(method, url) {
+        this.__biliReceive = matches(url, method) ? String(url) : null;
+        return originalOpen.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function() {
+        if (this.__biliReceive) {
+            const started = performance.now();
+            this.addEventListener('loadend', () => {
+                let text = null;
+                try { text = this.responseType === '' || this.responseType === 'text' ? this.responseText : JSON.stringify(this.response); } catch (e) {}
+                report(this.responseURL || this.__biliReceive, this.status, text, started);
+            });
+        }
+        return originalSend.apply(this, arguments);
+    };
+})();'''
+
+class ResponseDispatcher:
+    """上下文级领取接口响应分发器：在浏览器内过滤，只有领取接口的响应跨IPC，经有界队列按页面映射到task_id处理"""
+
+    def __init__(self, handler, queue_size=DISPATCH_QUEUE_SIZE):
+        self.handler = handler
+        self.page_tasks = {}
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.worker = None
+
+    async def install(self, context):
+        """在浏览器上下文上注册binding和钩子脚本并启动后台处理，须在打开任务页面之前调用"""
+        await self.attach(context)
+        self.start()
+
+    async def attach(self, context):
+        """在浏览器上下文上注册binding和钩子脚本，每个上下文只能注册一次"""
+        await context.expose_binding(RECEIVE_REPORT_BINDING, self.on_report)
+        await context.add_init_script(RECEIVE_HOOK_SCRIPT % {
+            "target_path": json.dumps(TARGET_API_PATH),
+            "binding": json.dumps(RECEIVE_REPORT_BINDING)
+        })
+
+    def start(self, handler=None):
+        """启动后台处理任务；复用已安装binding的上下文时传入本次运行的处理函数（同一上下文不能重复注册binding）"""
+        if handler:
+            self.handler = handler
+        self.page_tasks.clear()
+        self.dropped = 0
+        self.worker = asyncio.create_task(self.process_queue())
+
+    def register_page(self, page, task_id):
+        """登记页面对应的task_id"""
+        self.page_tasks[page] = task_id
+
+    def unregister_page(self, page):
+        self.page_tasks.pop(page, None)
+
+    def on_report(self, source, report):
+        """binding回调：只做入队，处理交给后台队列"""
+        task_id = self.page_tasks.get(source.get("page"))
+        if task_id is None:
+            return
+        try:
+            self.queue.put_nowait((task_id, report))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def process_queue(self):
+        """逐条处理领取接口响应"""
+        while True:
+            task_id, report = await self.queue.get()
+            try:
+                await self.handler(task_id, report)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 处理领取接口响应失败: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def close(self):
+        """处理完队列中剩余的响应后停止后台任务"""
+        if self.worker:
+            try:
+                await asyncio.wait_for(self.queue.join(), 2)
+            except asyncio.TimeoutError:
+                pass
+            self.worker.cancel()
+            self.worker = None
+            if self.dropped:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 响应队列已满，丢弃 {self.dropped} 条领取接口响应")
@@ -9,6 +9,10 @@ from .utils import utils
 from .logger import logger
 from .server import Server
 from .tasks import tasks
+from .clicker import CLICK_BACKENDS, DEFAULT_CLICK_BACKEND, DEFAULT_MAX_IN_FLIGHT
+from .runtime import browser_runtime
+from .browser import CDP_BROWSER_TYPE, DEFAULT_CDP_ENDPOINT
+from .crawler import TaskInfoCrawler
 
 # 配置
 ctk.set_appearance_mode("System")
@@ -33,7 +37,7 @@ class AutoClickerGUI:
         self.async_thread = None
         
         # 支持的浏览器类型
-        self.supported_browsers = ["firefox", "chromium", "webkit", "chrome", "msedge"]
+        self.supported_browsers = ["firefox", "chromium", "webkit", "chrome", "msedge", "cdp"]
         
         # 检测系统中安装的浏览器
         self.log("检测系统中安装的浏览器...")
@@ -59,6 +63,13 @@ class AutoClickerGUI:
         self.log("更新配置显示...")
         self.update_config_display()
         
+        # 常驻浏览器运行时：程序启动时预先启动浏览器，每次运行直接复用
+        self.runtime = browser_runtime if config_manager.server_config.get("persistent_runtime", True) else None
+        if self.runtime:
+            self.log("预启动浏览器运行时...")
+            self.warm_browser_runtime()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # 检查更新和获取公告
         self.log("检查更新...")
         self.check_for_updates()
@@ -221,7 +232,7 @@ class AutoClickerGUI:
         self.menu_var = ctk.StringVar(value="功能菜单")
         self.menu = ctk.CTkOptionMenu(
             menu_frame,
-            values=["保存配置", "特殊功能", "B站登录", "手动上传结果", "上传日志文件", "退出"],
+            values=["保存配置", "特殊功能", "B站登录", "抓取任务信息", "手动上传结果", "上传日志文件", "退出"],
             variable=self.menu_var,
             command=self.handle_menu_selection,
             font=self.custom_fonts["small"]
@@ -517,7 +528,17 @@ class AutoClickerGUI:
         duration_entry = ctk.CTkEntry(form_frame, textvariable=duration_var, font=self.custom_fonts["default"])
         duration_entry.grid(row=3, column=1, sticky="ew", pady=8, padx=(10, 0))
         
-        ctk.CTkLabel(form_frame, text="开始时间格式: HH:MM:SS 或 +秒数", font=self.custom_fonts["small"]).grid(row=4, column=0, columnspan=2, sticky="w", pady=(10, 5))
+        ctk.CTkLabel(form_frame, text="点击后端:", font=self.custom_fonts["default"]).grid(row=4, column=0, sticky="w", pady=8)
+        backend_var = ctk.StringVar(value=current_config.get('click_backend', DEFAULT_CLICK_BACKEND))
+        backend_combo = ctk.CTkComboBox(form_frame, values=list(CLICK_BACKENDS.keys()), variable=backend_var, font=self.custom_fonts["default"])
+        backend_combo.grid(row=4, column=1, sticky="ew", pady=8, padx=(10, 0))
+        
+        ctk.CTkLabel(form_frame, text="最大并发点击:", font=self.custom_fonts["default"]).grid(row=5, column=0, sticky="w", pady=8)
+        in_flight_var = ctk.StringVar(value=str(current_config.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT)))
+        in_flight_entry = ctk.CTkEntry(form_frame, textvariable=in_flight_var, font=self.custom_fonts["default"])
+        in_flight_entry.grid(row=5, column=1, sticky="ew", pady=8, padx=(10, 0))
+        
+        ctk.CTkLabel(form_frame, text="开始时间格式: HH:MM:SS 或 +秒数；最大并发点击为1时串行点击", font=self.custom_fonts["small"]).grid(row=6, column=0, columnspan=2, sticky="w", pady=(10, 5))
         
         form_frame.columnconfigure(1, weight=1)
         
@@ -526,12 +547,13 @@ class AutoClickerGUI:
         
         ctk.CTkLabel(preview_frame, text="配置预览:", font=self.custom_fonts["default"]).pack(anchor="w")
         
-        preview_text = ctk.CTkTextbox(preview_frame, height=80, font=self.custom_fonts["monospace"])
+        preview_text = ctk.CTkTextbox(preview_frame, height=100, font=self.custom_fonts["monospace"])
         preview_text.pack(fill="x", pady=(5, 0))
         preview_text.insert("1.0", f"TaskID: {task_var.get()}\n")
         preview_text.insert("end", f"开始时间: {start_var.get()}\n")
         preview_text.insert("end", f"点击间隔: {interval_var.get()}秒\n")
-        preview_text.insert("end", f"持续时间: {duration_var.get()}秒")
+        preview_text.insert("end", f"持续时间: {duration_var.get()}秒\n")
+        preview_text.insert("end", f"点击后端: {backend_var.get()}")
         preview_text.configure(state="disabled")
         
         def update_preview():
@@ -540,13 +562,15 @@ class AutoClickerGUI:
             preview_text.insert("1.0", f"TaskID: {task_var.get()}\n")
             preview_text.insert("end", f"开始时间: {start_var.get()}\n")
             preview_text.insert("end", f"点击间隔: {interval_var.get()}秒\n")
-            preview_text.insert("end", f"持续时间: {duration_var.get()}秒")
+            preview_text.insert("end", f"持续时间: {duration_var.get()}秒\n")
+            preview_text.insert("end", f"点击后端: {backend_var.get()}")
             preview_text.configure(state="disabled")
         
         task_var.trace("w", lambda *args: update_preview())
         start_var.trace("w", lambda *args: update_preview())
         interval_var.trace("w", lambda *args: update_preview())
         duration_var.trace("w", lambda *args: update_preview())
+        backend_var.trace("w", lambda *args: update_preview())
         
         button_frame = ctk.CTkFrame(main_container, fg_color="transparent")
         button_frame.pack(fill="x", pady=(15, 0))
@@ -557,7 +581,9 @@ class AutoClickerGUI:
                 new_start = start_var.get()
                 new_interval = interval_var.get()
                 new_duration = duration_var.get()
-                success, message = tasks.update_task(task_id, new_start, new_interval, new_duration)
+                new_backend = backend_var.get()
+                new_in_flight = in_flight_var.get()
+                success, message = tasks.update_task(task_id, new_start, new_interval, new_duration, new_backend, new_in_flight)
                 if success:
                     dialog.destroy()
                     self.log(f"已更新TaskID {task_id} 的配置")
@@ -641,12 +667,38 @@ class AutoClickerGUI:
             self.open_special_features()
         elif selection == "B站登录":
             self.login_bilibili()
+        elif selection == "抓取任务信息":
+            self.start_crawl()
         elif selection == "手动上传结果":
             self.trigger_batch_upload()
         elif selection == "上传日志文件":
             self.trigger_log_upload()
         elif selection == "退出":
-            self.root.quit()
+            self.on_close()
+    
+    def on_close(self):
+        """退出程序：先关闭常驻浏览器运行时"""
+        if self.runtime:
+            self.runtime.shutdown()
+        self.root.quit()
+    
+    def warm_browser_runtime(self):
+        """在后台启动常驻浏览器，完成后在日志中显示启动耗时"""
+        future = self.runtime.submit(self.runtime.warm_up(
+            config_manager.browser_config.get("browser_type", "chromium"),
+            config_manager.browser_config.get("browser_executable_path"),
+            config_manager.get_cookies_dir(),
+            config_manager.browser_config.get("cdp_endpoint")
+        ))
+        
+        def on_done(done_future):
+            try:
+                success, message = done_future.result()
+            except Exception as e:
+                success, message = False, f"浏览器运行时启动失败: {str(e)}"
+            self.root.after(0, lambda: self.log(f"{'✅' if success else '⚠️'} {message}"))
+        
+        future.add_done_callback(on_done)
     
     def check_for_updates(self):
         """检查更新"""
@@ -755,6 +807,10 @@ class AutoClickerGUI:
         browser_type = self.browser_var.get()
         self.log(f"浏览器已切换为: {browser_type}")
         
+        if browser_type == CDP_BROWSER_TYPE:
+            self.log(f"连接模式：请先以 --remote-debugging-port 参数启动已登录的Chrome/Edge，连接地址: {config_manager.browser_config.get('cdp_endpoint') or DEFAULT_CDP_ENDPOINT}")
+            return
+        
         # 如果检测到该浏览器的路径，自动填充
         if browser_type in self.browser_paths:
             self.browser_path_var.set(self.browser_paths[browser_type])
@@ -809,23 +865,29 @@ class AutoClickerGUI:
     def run_async_tasks(self):
         """在单独的线程中运行异步任务"""
         try:
-            # 创建新的事件循环
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # 为Windows设置正确的事件循环策略
-            import sys
-            if sys.platform.startswith('win'):
-                asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-            
-            # 运行主异步函数
-            success, message = loop.run_until_complete(tasks.execute_tasks(
+            task_args = (
                 config_manager.browser_config.get("browser_type", "chromium"),
                 config_manager.browser_config.get("browser_executable_path"),
                 config_manager.get_cookies_dir(),
                 config_manager.client_config['server_url'],
                 lambda: self.running
-            ))
+            )
+            
+            if self.runtime:
+                # 在常驻运行时的事件循环中执行，复用已启动的浏览器
+                success, message = self.runtime.run(tasks.execute_tasks(*task_args, runtime=self.runtime))
+            else:
+                # 创建新的事件循环
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                
+                # 为Windows设置正确的事件循环策略
+                import sys
+                if sys.platform.startswith('win'):
+                    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+                
+                # 运行主异步函数
+                success, message = loop.run_until_complete(tasks.execute_tasks(*task_args))
             
             self.log(f"\n=== 任务执行结果 ===")
             self.log(message)
@@ -847,6 +909,49 @@ class AutoClickerGUI:
             
             self.root.after(0, update_gui)
     
+    def start_crawl(self):
+        """任务信息抓取模式：只读取任务列表中各TaskID的任务信息并上传，不点击"""
+        if not tasks.task_configs:
+            messagebox.showwarning("警告", "请先添加任务")
+            return
+        if self.running:
+            messagebox.showwarning("警告", "任务正在执行中")
+            return
+        self.running = True
+        self.start_button.configure(state="disabled")
+        self.stop_button.configure(state="normal")
+        self.async_thread = threading.Thread(target=self.run_async_crawl, daemon=True)
+        self.async_thread.start()
+    
+    def run_async_crawl(self):
+        """在单独的线程中抓取任务信息"""
+        try:
+            crawler = TaskInfoCrawler.from_config(config_manager.server_config.get("crawl", {}))
+            crawl_args = (
+                config_manager.browser_config.get("browser_type", "chromium"),
+                config_manager.browser_config.get("browser_executable_path"),
+                config_manager.get_cookies_dir(),
+                config_manager.client_config['server_url'],
+                list(tasks.task_configs),
+                lambda: self.running
+            )
+            if self.runtime:
+                success, message = self.runtime.run(crawler.crawl(*crawl_args, runtime=self.runtime))
+            else:
+                success, message = asyncio.run(crawler.crawl(*crawl_args))
+            self.log(f"\n=== 任务信息抓取结果 ===")
+            self.log(message)
+        except Exception as e:
+            self.log(f"任务信息抓取错误: {str(e)}")
+        finally:
+            self.running = False
+            
+            def update_gui():
+                self.start_button.configure(state="normal")
+                self.stop_button.configure(state="disabled")
+            
+            self.root.after(0, update_gui)
+    
     def trigger_batch_upload(self):
         if not tasks.reward_result_cache and not tasks.task_configs:
             messagebox.showinfo("提示", "没有任务结果可上传")
@@ -978,6 +1083,25 @@ class AutoClickerGUI:
         """B站登录功能"""
         self.log("正在启动B站登录...")
         
+        # 常驻运行时占用了Cookie目录，直接在其上下文中打开登录页面
+        if self.runtime:
+            future = self.runtime.submit(self.runtime.login(
+                config_manager.browser_config.get("browser_type", "chromium"),
+                config_manager.browser_config.get("browser_executable_path"),
+                config_manager.get_cookies_dir(),
+                config_manager.browser_config.get("cdp_endpoint")
+            ))
+            
+            def on_login_done(done_future):
+                try:
+                    success, message = done_future.result()
+                except Exception as e:
+                    success, message = False, str(e)
+                self.root.after(0, lambda: self.log(f"✅ B站登录成功: {message}" if success else f"❌ B站登录失败: {message}"))
+            
+            future.add_done_callback(on_login_done)
+            return
+        
         # 创建Browser实例
         from .browser import Browser
         browser = Browser(
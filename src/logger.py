@@ -5,6 +5,7 @@ from .utils import utils
 
 # 日志配置
 LOG_FILE_NAME = "api_responses.log"
+RATE_CONTROL_LOG_FILE_NAME = "rate_control.log"
 LOG_DIR = "logs"
 
 class Logger:
@@ -35,6 +36,23 @@ class Logger:
         except Exception as e:
             print(f"❌ 保存API响应到日志文件失败：{str(e)}")
     
+    def save_rate_adjustment_to_log(self, task_id, adjustment):
+        """将点击速率调整记录保存到本地日志文件"""
+        try:
+            log_entry = {
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "task_id": task_id,
+                "device_name": utils.get_windows_device_name(),
+                "adjustment": adjustment
+            }
+            
+            log_path = os.path.join(os.path.dirname(self.log_file_path), RATE_CONTROL_LOG_FILE_NAME)
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+                
+        except Exception as e:
+            print(f"❌ 保存速率调整日志失败：{str(e)}")
+    
     def upload_log_file(self, server_url):
         """上传日志文件到服务器"""
         if not os.path.exists(self.log_file_path):
@@ -0,0 +1,118 @@
+import time
+from datetime import datetime
+from .server import RESPONSE_SUCCESS, RESPONSE_THROTTLED
+from .logger import logger
+
+# 速率控制默认参数
+DEFAULT_MIN_INTERVAL = None     # 最小点击间隔（秒），None表示按任务配置的间隔推算
+DEFAULT_MAX_INTERVAL = None     # 最大点击间隔（秒），None表示按任务配置的间隔推算
+MIN_INTERVAL_FACTOR = 0.5       # 未配置最小间隔时，最快只加速到任务间隔的该倍数
+MAX_INTERVAL_FACTOR = 4.0       # 未配置最大间隔时，最慢只减速到任务间隔的该倍数
+DEFAULT_INCREASE_STEP = 0.5     # 正常响应时速率的加性增量（次/秒）
+DEFAULT_DECREASE_FACTOR = 0.5   # 限流响应时速率的乘性减少系数
+DEFAULT_DECREASE_COOLDOWN = 0.5 # 两次减速之间的最短间隔（秒），避免在途请求的限流响应连续减速
+DEFAULT_GLOBAL_MAX_RATE = None  # 所有进行中任务的总点击速率上限（次/秒），None表示不限制
+
+class RateController:
+    """AIMD点击速率控制器：根据领取接口的响应实时调整每个任务的点击间隔"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 increase_step=DEFAULT_INCREASE_STEP, decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 decrease_cooldown=DEFAULT_DECREASE_COOLDOWN, global_max_rate=DEFAULT_GLOBAL_MAX_RATE):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.global_max_rate = global_max_rate
+        self.intervals = {}
+        self.bounds = {}
+        self.active_tasks = set()
+        self.last_decrease = {}
+        self.adjustment_counts = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的rate_control配置创建控制器"""
+        return cls(
+            min_interval=config.get("min_interval", DEFAULT_MIN_INTERVAL),
+            max_interval=config.get("max_interval", DEFAULT_MAX_INTERVAL),
+            increase_step=config.get("increase_step", DEFAULT_INCREASE_STEP),
+            decrease_factor=config.get("decrease_factor", DEFAULT_DECREASE_FACTOR),
+            decrease_cooldown=config.get("decrease_cooldown", DEFAULT_DECREASE_COOLDOWN),
+            global_max_rate=config.get("global_max_rate", DEFAULT_GLOBAL_MAX_RATE)
+        )
+
+    def get_bounds(self, interval):
+        """任务的间隔范围：配置了最小/最大间隔时使用配置值，否则按任务自身的间隔推算"""
+        min_interval = self.min_interval if self.min_interval is not None else interval * MIN_INTERVAL_FACTOR
+        max_interval = self.max_interval if self.max_interval is not None else interval * MAX_INTERVAL_FACTOR
+        return min_interval, max(min_interval, max_interval)
+
+    def clamp(self, task_id, interval):
+        min_interval, max_interval = self.bounds[task_id]
+        return min(max(interval, min_interval), max_interval)
+
+    @staticmethod
+    def is_accepted(category, response_code, status_code):
+        """只有领取成功，或服务端正常处理（HTTP 200且返回了业务码）的响应才算被接受，可以加速"""
+        if category == RESPONSE_SUCCESS:
+            return True
+        return category != RESPONSE_THROTTLED and status_code == 200 and response_code is not None
+
+    def register_task(self, task_id, interval):
+        """登记任务的初始点击间隔"""
+        self.bounds[task_id] = self.get_bounds(interval)
+        self.intervals[task_id] = self.clamp(task_id, interval)
+        self.adjustment_counts[task_id] = 0
+        self.active_tasks.add(task_id)
+
+    def release_task(self, task_id):
+        """任务提前结束，把它的速率预算让给其余进行中的任务"""
+        self.active_tasks.discard(task_id)
+
+    def get_interval(self, task_id):
+        """获取任务当前的点击间隔，受总速率上限在进行中任务间的平均分配约束"""
+        interval = self.intervals[task_id]
+        if self.global_max_rate and self.active_tasks:
+            interval = max(interval, len(self.active_tasks) / self.global_max_rate)
+        return interval
+
+    def observe(self, task_id, category, response_code=None, status_code=None):
+        """根据一次领取接口响应（已分类）调整点击间隔"""
+        if task_id not in self.intervals:
+            return
+
+        old_interval = self.intervals[task_id]
+        now = time.perf_counter()
+
+        if category == RESPONSE_THROTTLED:
+            if now - self.last_decrease.get(task_id, 0) < self.decrease_cooldown:
+                return
+            self.last_decrease[task_id] = now
+            # 乘性减速：速率乘以减少系数，即间隔除以该系数
+            new_interval = self.clamp(task_id, old_interval / self.decrease_factor)
+            reason = "throttled"
+        elif self.is_accepted(category, response_code, status_code):
+            # 加性增速：速率增加固定步长
+            new_interval = self.clamp(task_id, 1 / (1 / old_interval + self.increase_step))
+            reason = "accepted"
+        else:
+            # 非JSON响应、服务端错误等：既不加速也不减速
+            return
+
+        if new_interval == old_interval:
+            return
+
+        self.intervals[task_id] = new_interval
+        self.adjustment_counts[task_id] += 1
+        adjustment = {
+            "reason": reason,
+            "category": category,
+            "response_code": response_code,
+            "status_code": status_code,
+            "old_interval": round(old_interval, 4),
+            "new_interval": round(new_interval, 4)
+        }
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 点击间隔 {old_interval * 1000:.1f}ms -> {new_interval * 1000:.1f}ms（{reason}, code={response_code}）")
+        logger.save_rate_adjustment_to_log(task_id, adjustment)
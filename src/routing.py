@@ -0,0 +1,133 @@
+import base64
+import re
+from datetime import datetime
+from urllib.parse import urlparse
+from .server import TARGET_API_PATH, MISSION_INFO_API_PATH
+
+# 默认路由规则：点击循环用不到的资源直接拦截或返回占位内容
+DEFAULT_BLOCK_RESOURCE_TYPES = ["image", "media", "font"]
+DEFAULT_BLOCK_URL_PATTERNS = [
+    "data.bilibili.com",        # 埋点上报
+    "cm.bilibili.com",          # 广告
+    "api.live.bilibili.com"     # 直播挂件
+]
+DEFAULT_STUB_URL_PATTERNS = [
+    "/bfs/seed/log/report"      # 上报SDK，返回空脚本避免页面报错
+]
+DEFAULT_ALLOW_URL_PATTERNS = [TARGET_API_PATH, MISSION_INFO_API_PATH]
+NEVER_ROUTE_HOSTS = ["api.bilibili.com"]    # 接口域名的请求从不经过路由，保留页面内过滤和HTTP缓存
+
+# 路由只能按URL注册，按资源类型拦截时用扩展名判断请求是否需要经过路由
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "m4s", "flv", "webm", "mp3", "m4a"]
+}
+
+# 被拦截请求的假定大小（字节）：请求被拦截后无法得知实际大小，仅用于估算节省的流量，可在配置中覆盖
+DEFAULT_ESTIMATED_BYTES = {
+    "image": 20000,
+    "media": 500000,
+    "font": 60000,
+    "script": 30000,
+    "stylesheet": 10000,
+    "other": 1000
+}
+
+# 1x1透明GIF，用于图片占位
+TRANSPARENT_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+class RouteRules:
+    """上下文级请求路由规则：按资源类型和URL模式拦截或占位，只有可能被拦截的请求才经过路由，接口域名和白名单始终放行"""
+
+    def __init__(self, block_resource_types=None, block_url_patterns=None, stub_url_patterns=None,
+                 allow_url_patterns=None, estimated_bytes=None):
+        self.block_resource_types = set(block_resource_types if block_resource_types is not None else DEFAULT_BLOCK_RESOURCE_TYPES)
+        self.block_url_patterns = block_url_patterns if block_url_patterns is not None else DEFAULT_BLOCK_URL_PATTERNS
+        self.stub_url_patterns = stub_url_patterns if stub_url_patterns is not None else DEFAULT_STUB_URL_PATTERNS
+        # 领取接口和任务信息接口不允许被配置移出白名单
+        self.allow_url_patterns = list(DEFAULT_ALLOW_URL_PATTERNS) + list(allow_url_patterns or [])
+        self.estimated_bytes = dict(DEFAULT_ESTIMATED_BYTES)
+        self.estimated_bytes.update(estimated_bytes or {})
+        extensions = [extension for resource_type in self.block_resource_types
+                      for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type, [])]
+        # B站图片地址可能带有@参数后缀（如 xxx.jpg@100w.webp）
+        self.extension_pattern = re.compile(r"\.(%s)(@[^/]*)?$" % "|".join(extensions), re.IGNORECASE) if extensions else None
+        self.blocked_counts = {}
+        self.blocked_bytes = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的route_rules配置创建路由规则"""
+        return cls(
+            block_resource_types=config.get("block_resource_types"),
+            block_url_patterns=config.get("block_url_patterns"),
+            stub_url_patterns=config.get("stub_url_patterns"),
+            allow_url_patterns=config.get("allow_url_patterns"),
+            estimated_bytes=config.get("estimated_bytes")
+        )
+
+    async def install(self, context):
+        """在浏览器上下文（或单个页面）上注册路由，只匹配可能被拦截的URL（经过路由的请求不使用HTTP缓存）"""
+        await context.route(self.should_route, self.handle_route)
+
+    async def uninstall(self, context):
+        """从常驻的浏览器上下文上移除路由，避免下次运行重复注册"""
+        await context.unroute(self.should_route, self.handle_route)
+
+    def should_route(self, url):
+        """路由的URL匹配函数：接口域名和白名单不经过路由，其余只匹配拦截、占位模式和被拦截资源类型的扩展名"""
+        if urlparse(url).hostname in NEVER_ROUTE_HOSTS:
+            return False
+        if any(pattern in url for pattern in self.allow_url_patterns):
+            return False
+        if any(pattern in url for pattern in self.stub_url_patterns + self.block_url_patterns):
+            return True
+        return bool(self.extension_pattern and self.extension_pattern.search(urlparse(url).path))
+
+    def match(self, request):
+        """返回请求命中的动作：allow/stub/block，未命中返回None"""
+        url = request.url
+        if any(pattern in url for pattern in self.allow_url_patterns):
+            return "allow"
+        if any(pattern in url for pattern in self.stub_url_patterns):
+            return "stub"
+        if request.resource_type in self.block_resource_types:
+            return "stub" if request.resource_type == "image" else "block"
+        if any(pattern in url for pattern in self.block_url_patterns):
+            return "block"
+        return None
+
+    async def handle_route(self, route):
+        request = route.request
+        action = self.match(request)
+        if action in (None, "allow"):
+            await route.fallback()
+            return
+
+        resource_type = request.resource_type
+        self.blocked_counts[resource_type] = self.blocked_counts.get(resource_type, 0) + 1
+        self.blocked_bytes += self.estimated_bytes.get(resource_type, self.estimated_bytes["other"])
+
+        if action == "stub":
+            if resource_type == "image":
+                await route.fulfill(status=200, content_type="image/gif", body=TRANSPARENT_GIF)
+            elif resource_type == "script":
+                await route.fulfill(status=200, content_type="application/javascript", body="")
+            else:
+                await route.fulfill(status=204, body="")
+        else:
+            await route.abort("blockedbyclient")
+
+    def get_report(self):
+        """汇总本次运行拦截的请求数和按假定大小估算的节省流量（非实测）"""
+        return {
+            "blocked_requests": sum(self.blocked_counts.values()),
+            "blocked_by_type": dict(self.blocked_counts),
+            "blocked_bytes_estimate": self.blocked_bytes
+        }
+
+    def print_report(self):
+        report = self.get_report()
+        by_type = "，".join(f"{resource_type} {count}" for resource_type, count in report["blocked_by_type"].items())
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 路由规则: 共拦截 {report['blocked_requests']} 个请求（{by_type or '无'}），估算节省流量约 {report['blocked_bytes_estimate'] / 1024 / 1024:.2f}MB（按每类资源的假定大小估算，非实测）")
@@ -0,0 +1,253 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from .browser import Browser, CDP_BROWSER_TYPE
+
+# 常驻浏览器运行时配置
+RUNTIME_HEALTH_TIMEOUT = 3.0                    # 健康检查超时（秒）
+RUNTIME_HEALTH_URL = "https://www.bilibili.com" # 健康检查时读取该域名的Cookie
+RUNTIME_SHUTDOWN_TIMEOUT = 5.0                  # 退出时等待浏览器关闭的超时（秒）
+RECONNECT_DELAY_MIN = 1.0                       # 连接模式断线后首次重连的等待（秒）
+RECONNECT_DELAY_MAX = 30.0                      # 重连等待的上限（秒），每次失败翻倍
+LOGIN_URL = "https://passport.bilibili.com/login"
+
+class BrowserRuntime:
+    """常驻浏览器运行时：在独立线程的事件循环中保持Playwright和持久化上下文，健康检查失败或浏览器配置变化时才重新启动，每次运行直接复用"""
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.lock = None
+        self.playwright = None
+        self.context = None
+        self.cdp_browser = None
+        self.launch_key = None
+        self.last_acquire_args = None
+        self.reconnect_task = None
+        self.closing = False
+        self.dispatcher = None
+        self.plain_browser = None
+        self.plain_browser_key = None
+        self.launch_count = 0
+        self.last_launch_ms = None
+
+    def start(self):
+        """启动运行时线程和事件循环（只启动一次）"""
+        if self.loop:
+            return
+        ready = threading.Event()
+
+        def run_loop():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.lock = asyncio.Lock()
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def submit(self, coro):
+        """把协程提交到运行时的事件循环，返回concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """在运行时的事件循环中执行协程并阻塞等待结果，须在GUI主线程以外调用"""
+        return self.submit(coro).result(timeout)
+
+    async def is_healthy(self):
+        """用一次Cookie读取往返确认上下文和浏览器进程仍然可用"""
+        if not self.context:
+            return False
+        if self.cdp_browser and not self.cdp_browser.is_connected():
+            return False
+        try:
+            await asyncio.wait_for(self.context.cookies(RUNTIME_HEALTH_URL), RUNTIME_HEALTH_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def acquire(self, browser_type, browser_executable_path, cookies_dir, cdp_endpoint=None):
+        """返回可用的浏览器上下文和本次是否重新启动；首次使用、配置变化或健康检查失败时才启动（或重新连接）浏览器"""
+        async with self.lock:
+            self.last_acquire_args = (browser_type, browser_executable_path, cookies_dir, cdp_endpoint)
+            launch_key = self.last_acquire_args
+            if launch_key == self.launch_key and await self.is_healthy():
+                return self.context, False
+
+            if self.context:
+                reason = "浏览器配置已变化" if launch_key != self.launch_key else "健康检查失败"
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器运行时{reason}，重新启动浏览器")
+            await self.close_context()
+
+            launch_start = time.perf_counter()
+            browser = Browser(browser_type, browser_executable_path, cookies_dir, cdp_endpoint)
+            try:
+                if not self.playwright:
+                    self.playwright = await browser.setup_browser()
+                context = await self.open_context(browser)
+            except Exception:
+                # Playwright驱动本身可能已失效，重启驱动后再试一次
+                await self.stop_playwright()
+                self.playwright = await browser.setup_browser()
+                context = await self.open_context(browser)
+
+            self.context = context
+            self.launch_key = launch_key
+            context.on("close", self.on_context_close)
+            self.launch_count += 1
+            self.last_launch_ms = round((time.perf_counter() - launch_start) * 1000, 1)
+            action = f"已连接 {browser.cdp_endpoint}" if self.cdp_browser else "已启动"
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器运行时{action}（第{self.launch_count}次），耗时 {self.last_launch_ms:.0f}ms")
+            return self.context, True
+
+    async def open_context(self, browser):
+        """连接模式通过CDP复用已运行的浏览器，其余模式启动持久化上下文"""
+        if browser.browser_type == CDP_BROWSER_TYPE:
+            self.cdp_browser, context = await browser.connect_over_cdp(self.playwright)
+            self.cdp_browser.on("disconnected", self.on_cdp_disconnected)
+            return context
+        return await browser.launch_browser(self.playwright)
+
+    def on_cdp_disconnected(self, cdp_browser):
+        """连接模式的socket断开：丢弃上下文并在后台自动重连"""
+        if cdp_browser is not self.cdp_browser:
+            return
+        self.forget_context()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 与浏览器的CDP连接已断开，正在自动重连")
+        if not self.closing and self.last_acquire_args and not self.reconnect_task:
+            self.reconnect_task = asyncio.ensure_future(self.reconnect())
+
+    async def reconnect(self):
+        """按指数退避重连，直到成功、浏览器配置改为其他模式或运行时关闭"""
+        delay = RECONNECT_DELAY_MIN
+        try:
+            while not self.closing and self.last_acquire_args and self.last_acquire_args[0] == CDP_BROWSER_TYPE:
+                try:
+                    await self.acquire(*self.last_acquire_args)
+                    return
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 重连浏览器失败: {str(e)}，{delay:.0f}秒后重试")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_DELAY_MAX)
+        finally:
+            self.reconnect_task = None
+
+    async def acquire_plain_browser(self, browser_type, browser_executable_path):
+        """返回常驻的无配置目录浏览器（登录状态导出模式使用），断开连接或配置变化时重新启动"""
+        async with self.lock:
+            browser_key = (browser_type, browser_executable_path)
+            if self.plain_browser and browser_key == self.plain_browser_key and self.plain_browser.is_connected():
+                return self.plain_browser, False
+
+            await self.close_plain_browser()
+            launch_start = time.perf_counter()
+            browser = Browser(browser_type, browser_executable_path, None)
+            if not self.playwright:
+                self.playwright = await browser.setup_browser()
+            self.plain_browser = await browser.launch_plain_browser(self.playwright)
+            self.plain_browser_key = browser_key
+            self.last_launch_ms = round((time.perf_counter() - launch_start) * 1000, 1)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 轻量上下文浏览器已启动，耗时 {self.last_launch_ms:.0f}ms")
+            return self.plain_browser, True
+
+    async def close_plain_browser(self):
+        plain_browser = self.plain_browser
+        self.plain_browser = None
+        self.plain_browser_key = None
+        if plain_browser:
+            try:
+                await plain_browser.close()
+            except Exception:
+                pass
+
+    def on_context_close(self, context):
+        """浏览器被手动关闭或崩溃时丢弃上下文，下次使用时重新启动"""
+        if context is self.context:
+            self.forget_context()
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 浏览器运行时的上下文已关闭，下次运行时重新启动")
+
+    def forget_context(self):
+        self.context = None
+        self.cdp_browser = None
+        self.launch_key = None
+        self.dispatcher = None
+
+    async def release(self, browser):
+        """一次运行结束：只关闭本次运行打开的页面，上下文（以及连接模式下浏览器中原有的页面）留给下次运行"""
+        await browser.close_opened_pages()
+
+    async def warm_up(self, browser_type, browser_executable_path, cookies_dir, cdp_endpoint=None):
+        """提前启动（或连接）浏览器，让第一次运行也不用等待启动"""
+        try:
+            await self.acquire(browser_type, browser_executable_path, cookies_dir, cdp_endpoint)
+            return True, f"浏览器运行时已就绪，启动耗时 {self.last_launch_ms:.0f}ms"
+        except Exception as e:
+            return False, f"浏览器运行时启动失败: {str(e)}"
+
+    async def login(self, browser_type, browser_executable_path, cookies_dir, cdp_endpoint=None):
+        """在常驻上下文中打开登录页面，登录页面被关闭后返回"""
+        page = None
+        try:
+            context, _ = await self.acquire(browser_type, browser_executable_path, cookies_dir, cdp_endpoint)
+            page = await context.new_page()
+            await page.goto(LOGIN_URL, timeout=60000)
+            print("请在浏览器中完成B站登录...")
+            print("登录完成后，请关闭登录页面")
+            while not page.is_closed():
+                await asyncio.sleep(2)
+            return True, "登录完成"
+        except Exception as e:
+            return False, f"登录失败: {str(e)}"
+        finally:
+            if page and not page.is_closed():
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+    async def close_context(self):
+        """持久化上下文直接关闭；连接模式只断开连接，不关闭用户的浏览器"""
+        context = self.context
+        cdp_browser = self.cdp_browser
+        self.forget_context()
+        try:
+            if cdp_browser:
+                await cdp_browser.close()
+            elif context:
+                await context.close()
+        except Exception:
+            pass
+
+    async def stop_playwright(self):
+        playwright = self.playwright
+        self.playwright = None
+        if playwright:
+            try:
+                await playwright.stop()
+            except Exception:
+                pass
+
+    async def close(self):
+        self.closing = True
+        if self.reconnect_task:
+            self.reconnect_task.cancel()
+        await self.close_context()
+        await self.close_plain_browser()
+        await self.stop_playwright()
+
+    def shutdown(self):
+        """关闭浏览器并停止运行时线程，在程序退出时调用"""
+        if not self.loop:
+            return
+        try:
+            self.run(self.close(), RUNTIME_SHUTDOWN_TIMEOUT)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 关闭浏览器运行时失败: {str(e)}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+# 全局浏览器运行时实例
+browser_runtime = BrowserRuntime()
@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+
+# 调度配置
+COARSE_LOG_INTERVAL = 1.0       # 粗等待阶段倒计时日志间隔（秒），同时也是检查停止信号的最长间隔
+COARSE_LOG_INTERVAL_NEAR = 0.5  # 剩余不足5秒时的倒计时日志间隔（秒）
+FINE_WAIT_WINDOW = 0.03         # 距截止时间小于该值时切换为单调时钟精细等待（秒）
+
+class StartScheduler:
+    """开始时间调度器：所有截止时间放在一个最小堆中，由一个定时服务睡眠到最近的截止时间再释放等待的任务，同一时刻的任务共用一个定时器"""
+
+    def __init__(self, clock_offset=0.0):
+        self.timers = {}
+        self.heap = []
+        self.sequence = 0
+        self.wakeup = None
+        self.service_task = None
+        self.release_errors = {}
+        # 参考时钟（服务端）与本机时钟的偏差，单位秒
+        self.clock_offset = clock_offset
+
+    def seconds_until(self, start_time):
+        """按校正后的时间计算距开始时间的秒数"""
+        return (start_time - datetime.now()).total_seconds() - self.clock_offset
+
+    def to_deadline(self, start_time):
+        """将参考时钟下的墙上时间换算为本机perf_counter截止时间"""
+        return time.perf_counter() + self.seconds_until(start_time)
+
+    def get_timer(self, start_time, running_flag=None, countdown=True):
+        """返回该时刻的定时器，不存在时加入堆并唤醒定时服务"""
+        timer = self.timers.get(start_time)
+        if timer is None:
+            deadline = self.to_deadline(start_time)
+            timer = {
+                "start_time": start_time,
+                "deadline": deadline,
+                "event": asyncio.Event(),
+                "on_time": deadline > time.perf_counter(),
+                "running_flag": running_flag,
+                "countdown": countdown,
+                "waiters": 0,
+                "stopped": False
+            }
+            self.timers[start_time] = timer
+            heapq.heappush(self.heap, (deadline, self.sequence, timer))
+            self.sequence += 1
+            self.ensure_service()
+        timer["countdown"] = timer["countdown"] or countdown
+        return timer
+
+    def ensure_service(self):
+        """定时服务未运行时启动，运行中则唤醒它重新计算下一次醒来的时间"""
+        if self.service_task is None or self.service_task.done():
+            self.wakeup = asyncio.Event()
+            self.service_task = asyncio.create_task(self.run_service())
+        else:
+            self.wakeup.set()
+
+    async def wait(self, task_id, start_time, running_flag=None):
+        """等待开始时间，返回该任务的释放误差（毫秒），开始时间已过或被用户终止则返回None（不记录释放误差）"""
+        timer = self.get_timer(start_time, running_flag)
+        timer["waiters"] += 1
+        await timer["event"].wait()
+        if not timer["on_time"] or timer["stopped"] or (running_flag and not running_flag()):
+            return None
+
+        release_error = (time.perf_counter() - timer["deadline"]) * 1000
+        self.release_errors[task_id] = release_error
+        return release_error
+
+    async def sleep_until(self, start_time, running_flag=None):
+        """不计入倒计时日志和释放误差的等待，用于提前加载页面等准备工作"""
+        await self.get_timer(start_time, running_flag, countdown=False)["event"].wait()
+
+    @staticmethod
+    def is_stopped(timer):
+        return timer["running_flag"] is not None and not timer["running_flag"]()
+
+    def release(self, timer):
+        self.timers.pop(timer["start_time"], None)
+        timer["event"].set()
+
+    def release_stopped(self):
+        """用户终止时立即释放对应的定时器"""
+        stopped = [entry for entry in self.heap if self.is_stopped(entry[2])]
+        if not stopped:
+            return
+        for entry in stopped:
+            entry[2]["stopped"] = True
+            self.release(entry[2])
+        self.heap = [entry for entry in self.heap if not entry[2]["event"].is_set()]
+        heapq.heapify(self.heap)
+
+    def log_countdown(self, now):
+        """统一输出倒计时：只报告最近的一个开始时间"""
+        pending = [entry[2] for entry in self.heap if entry[2]["countdown"]]
+        if not pending:
+            return
+        timer = min(pending, key=lambda timer: timer["deadline"])
+        others = f"，另有{len(pending) - 1}个开始时间等待中" if len(pending) > 1 else ""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 等待开始时间 {timer['start_time'].strftime('%H:%M:%S')}（{timer['waiters']}个任务），剩余: {timer['deadline'] - now:.2f}秒{others}")
+
+    async def run_service(self):
+        """定时服务：睡眠到最近的截止时间（或下一次日志/停止检查），到点后一次性释放该时刻的所有任务"""
+        last_log_time = 0
+        while self.heap:
+            self.release_stopped()
+            if not self.heap:
+                break
+
+            now = time.perf_counter()
+            deadline, _, timer = self.heap[0]
+            remaining = deadline - now
+            if remaining <= FINE_WAIT_WINDOW:
+                # 精细等待：不依赖事件循环定时器精度，每轮让出一次事件循环
+                while time.perf_counter() < deadline and not self.is_stopped(timer):
+                    await asyncio.sleep(0)
+                now = time.perf_counter()
+                while self.heap and self.heap[0][0] <= now:
+                    self.release(heapq.heappop(self.heap)[2])
+                continue
+
+            log_interval = COARSE_LOG_INTERVAL_NEAR if remaining < 5 else COARSE_LOG_INTERVAL
+            if now - last_log_time >= log_interval:
+                self.log_countdown(now)
+                last_log_time = now
+
+            # 粗等待：有更早的截止时间加入时会被提前唤醒
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), min(remaining - FINE_WAIT_WINDOW, log_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    def get_report(self):
+        """汇总释放误差"""
+        if not self.release_errors:
+            return None
+        errors = list(self.release_errors.values())
+        return {
+            "count": len(errors),
+            "max_ms": max(errors),
+            "mean_ms": sum(errors) / len(errors)
+        }
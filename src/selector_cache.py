@@ -0,0 +1,64 @@
+import os
+import json
+from datetime import datetime
+from urllib.parse import urlparse
+from .utils import utils
+
+# 领取按钮选择器回退配置（均为XPath，与页面内点击脚本的document.evaluate一致）
+SELECTOR_CACHE_FILE_NAME = "selector_cache.json"
+DEFAULT_SELECTOR_CANDIDATES = []     # 默认不附加候选，宽泛的选择器可能命中领取按钮之外的元素，需要时在配置中指定
+
+class SelectorCache:
+    """领取按钮选择器回退链：配置的选择器始终最先尝试，失效时依次回退到该页面模板上次可用的选择器和其余候选"""
+
+    def __init__(self, path=None, candidates=None):
+        self.path = path or os.path.join(utils.get_exe_directory(), SELECTOR_CACHE_FILE_NAME)
+        self.candidates = candidates if candidates is not None else DEFAULT_SELECTOR_CANDIDATES
+        self.cache = self.read()
+        self.dirty = False
+        self.fallbacks = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的selector_fallback配置创建选择器缓存"""
+        return cls(path=config.get("path"), candidates=config.get("candidates"))
+
+    def read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    @staticmethod
+    def template_key(url):
+        """页面模板：去掉查询参数的页面地址，同一模板的任务页面结构相同"""
+        parsed = urlparse(url)
+        return f"{parsed.netloc}{parsed.path}"
+
+    def get_candidates(self, url, selector):
+        """按顺序返回候选选择器：配置的选择器、缓存的可用选择器、其余候选（修改配置后立即生效，不会被旧缓存覆盖）"""
+        ordered = [selector, self.cache.get(self.template_key(url))] + list(self.candidates)
+        return list(dict.fromkeys(candidate for candidate in ordered if candidate))
+
+    def remember(self, url, selector, candidates):
+        """记录本次命中的选择器，命中的不是配置的选择器时说明页面布局有变化"""
+        key = self.template_key(url)
+        if selector != candidates[0]:
+            self.fallbacks += 1
+        if self.cache.get(key) != selector:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 页面模板 {key} 的可用选择器已更新为: {selector}")
+            self.cache[key] = selector
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 选择器缓存保存失败: {str(e)}")
@@ -1,21 +1,93 @@
 import requests
 import json
 import os
+import time
+import hashlib
+import threading
+import statistics
 from datetime import datetime
 from .utils import utils
 from .logger import logger
 
 # API配置
 TARGET_API_PATH = "/x/activity_components/mission/receive"
+MISSION_INFO_API_PATH = "/x/activity_components/mission/info"
+
+# 领取接口响应分类
+RESPONSE_SUCCESS = "success"      # 领取成功，停止点击
+RESPONSE_TERMINAL = "terminal"    # 已领取、已领完等，继续点击没有意义，停止点击
+RESPONSE_THROTTLED = "throttled"  # 被限流，降低点击速率
+RESPONSE_RETRY = "retry"          # 其他失败，继续点击
+
+# 业务码 -> (分类, 停止原因)，可通过server_config中的receive_code_table覆盖或补充
+RECEIVE_CODE_TABLE = {
+    0: (RESPONSE_SUCCESS, "claimed"),
+    -101: (RESPONSE_TERMINAL, "not_logged_in"),
+    -412: (RESPONSE_THROTTLED, "request_blocked"),
+    -509: (RESPONSE_THROTTLED, "too_frequent"),
+    -799: (RESPONSE_THROTTLED, "too_frequent")
+}
+# 业务码未收录时按提示信息关键字判断终止类响应
+TERMINAL_MESSAGE_KEYWORDS = {
+    "已领取": "already_claimed",
+    "已经领取": "already_claimed",
+    "已领完": "sold_out",
+    "已抢完": "sold_out",
+    "已发完": "sold_out",
+    "库存不足": "sold_out",
+    "已结束": "expired",
+    "已过期": "expired"
+}
+THROTTLE_MESSAGE_KEYWORDS = ("频繁", "稍后再试")
+THROTTLE_STATUS_CODES = {412, 429}
+
 UPLOAD_ENDPOINT_SUFFIX = "/upload_reward_result"
 UPLOAD_PAGE_INFO_SUFFIX = "/upload_page_info"
+UPLOAD_PAGE_INFO_BATCH_SUFFIX = "/upload_page_info_batch"
+SERVER_TIME_SUFFIX = "/server_time"
 RETRY_COUNT = 2
+PAGE_INFO_CACHE_FILE = "page_info_cache.json"
+PAGE_INFO_HASH_FIELDS = ("task_id", "device_name", "section_title", "award_info")    # 提取时间不参与比较
+CLOCK_SYNC_SAMPLES = 8
+
+
+def build_receive_code_table(code_table=None):
+    """合并默认业务码表和配置中的receive_code_table，在加载配置时调用一次"""
+    table = dict(RECEIVE_CODE_TABLE)
+    if code_table:
+        # 配置文件中的键是字符串，值为[分类, 原因]
+        table.update({int(code): tuple(entry) for code, entry in code_table.items()})
+    return table
+
+
+def classify_receive_response(response_code, message="", status_code=None, code_table=None):
+    """对领取接口响应分类，返回(分类, 原因)；code_table为build_receive_code_table合并好的业务码表"""
+    if status_code in THROTTLE_STATUS_CODES:
+        return RESPONSE_THROTTLED, f"http_{status_code}"
+    
+    table = code_table if code_table is not None else RECEIVE_CODE_TABLE
+    if response_code in table:
+        return table[response_code]
+    
+    message = message or ""
+    for keyword, reason in TERMINAL_MESSAGE_KEYWORDS.items():
+        if keyword in message:
+            return RESPONSE_TERMINAL, reason
+    if any(keyword in message for keyword in THROTTLE_MESSAGE_KEYWORDS):
+        return RESPONSE_THROTTLED, "too_frequent"
+    return RESPONSE_RETRY, f"code_{response_code}"
+
 
 class Server:
     def __init__(self, server_url):
         self.server_url = server_url
         self.upload_endpoint = f"{server_url.rstrip('/')}{UPLOAD_ENDPOINT_SUFFIX}"
         self.upload_page_info_endpoint = f"{server_url.rstrip('/')}{UPLOAD_PAGE_INFO_SUFFIX}"
+        self.upload_page_info_batch_endpoint = f"{server_url.rstrip('/')}{UPLOAD_PAGE_INFO_BATCH_SUFFIX}"
+        self.page_info_cache_path = os.path.join(utils.get_exe_directory(), PAGE_INFO_CACHE_FILE)
+        self.page_info_hashes = None
+        self.page_info_updates = {}
+        self.page_info_lock = threading.Lock()
     
     def fetch_server_config(self):
         """从服务端拉取配置"""
@@ -43,14 +115,64 @@ class Server:
         except json.JSONDecodeError:
             return False, {}, {}, "服务端返回格式错误"
     
-    def batch_upload_results(self, reward_result_cache, task_configs):
+    def estimate_clock_offset(self, samples=CLOCK_SYNC_SAMPLES):
+        """NTP式估计本机与服务端的时钟偏差（服务端时间 - 本机时间，秒）；使用阻塞请求，异步代码中须放到线程池执行"""
+        if not isinstance(samples, int) or samples < 1:
+            return False, {"message": f"校时样本数必须为正整数，当前为: {samples}"}
+        server_api = f"{self.server_url.rstrip('/')}{SERVER_TIME_SUFFIX}"
+        measurements = []
+        
+        try:
+            with requests.Session() as session:
+                # 多取一次样本：第一次请求包含建连开销，不参与估计
+                for i in range(samples + 1):
+                    t0 = time.time()
+                    p0 = time.perf_counter()
+                    response = session.get(server_api, timeout=5)
+                    p3 = time.perf_counter()
+                    response.raise_for_status()
+                    data = response.json()
+                    if data.get("status") != "success":
+                        return False, {"message": data.get("message", "校时失败")}
+                    if i == 0:
+                        continue
+                    
+                    t1 = data["content"]["receive_time"]
+                    t2 = data["content"]["send_time"]
+                    t3 = t0 + (p3 - p0)
+                    measurements.append({
+                        "offset": ((t1 - t0) + (t2 - t3)) / 2,
+                        "rtt": (t3 - t0) - (t2 - t1)
+                    })
+        except requests.exceptions.RequestException as e:
+            return False, {"message": f"网络错误：{str(e)}"}
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return False, {"message": "服务器返回格式错误"}
+        
+        # 只保留往返时间较短的一半样本，再取偏差中位数
+        measurements.sort(key=lambda m: m["rtt"])
+        kept = measurements[:max(1, len(measurements) // 2)]
+        offsets = [m["offset"] for m in kept]
+        offset = statistics.median(offsets)
+        min_rtt = kept[0]["rtt"]
+        spread = statistics.median([abs(o - offset) for o in offsets])
+        
+        return True, {
+            "offset": offset,
+            "uncertainty": max(min_rtt / 2, spread),
+            "min_rtt": min_rtt,
+            "samples": len(measurements)
+        }
+    
+    def batch_upload_results(self, reward_result_cache, task_configs, run_info=None):
         """批量上传所有任务结果"""
         if not reward_result_cache and not task_configs:
             return False, "没有需要上传的结果数据"
             
-        # 补全未捕获结果的任务
+        # 补全未捕获结果的任务（多账号执行时结果按 任务@账号 存放）
+        reported_task_ids = {result.get("task_id") for result in reward_result_cache.values()}
         for task_id in task_configs.keys():
-            if task_id not in reward_result_cache:
+            if task_id not in reward_result_cache and task_id not in reported_task_ids:
                 reward_result_cache[task_id] = {
                     "task_id": task_id,
                     "status": "未执行",
@@ -65,6 +187,8 @@ class Server:
             "results": list(reward_result_cache.values()),
             "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
+        if run_info:
+            upload_data.update(run_info)
         
         # 带重试的上传逻辑
         for retry in range(RETRY_COUNT + 1):
@@ -105,6 +229,83 @@ class Server:
         except Exception as e:
             return False
     
+    def load_page_info_cache(self):
+        """读取各任务上次成功上传的页面信息内容哈希"""
+        try:
+            with open(self.page_info_cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def page_info_hash(page_info_data):
+        content = json.dumps({field: page_info_data.get(field) for field in PAGE_INFO_HASH_FIELDS}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    def is_page_info_changed(self, page_info_data):
+        """页面信息与该任务上次成功上传的内容不同（或从未上传）"""
+        with self.page_info_lock:
+            if self.page_info_hashes is None:
+                self.page_info_hashes = self.load_page_info_cache()
+            return self.page_info_hashes.get(str(page_info_data["task_id"])) != self.page_info_hash(page_info_data)
+    
+    def mark_page_info_uploaded(self, page_info_data):
+        content_hash = self.page_info_hash(page_info_data)
+        with self.page_info_lock:
+            self.page_info_hashes[str(page_info_data["task_id"])] = content_hash
+            self.page_info_updates[str(page_info_data["task_id"])] = content_hash
+    
+    def upload_page_info_if_changed(self, page_info_data):
+        """页面信息与该任务上次成功上传的内容相同时跳过上传，返回(是否上传, 是否成功)"""
+        if not self.is_page_info_changed(page_info_data):
+            return False, True
+        success = self.upload_page_info(page_info_data)
+        if success:
+            self.mark_page_info_uploaded(page_info_data)
+        return True, success
+    
+    def batch_upload_page_info(self, page_info_list):
+        """批量上传页面信息，内容未变化的跳过，失败时保存本地备份，返回(成功, 上传条数, 消息)"""
+        changed = [page_info for page_info in page_info_list if self.is_page_info_changed(page_info)]
+        if not changed:
+            return True, 0, f"{len(page_info_list)}条页面信息均未变化，跳过上传"
+        
+        upload_data = {"device_name": utils.get_windows_device_name(), "items": changed}
+        for retry in range(RETRY_COUNT + 1):
+            try:
+                headers = {"Content-Type": "application/json"}
+                response = requests.post(
+                    self.upload_page_info_batch_endpoint,
+                    data=json.dumps(upload_data, ensure_ascii=False),
+                    headers=headers,
+                    timeout=30
+                )
+                response.raise_for_status()
+                for page_info in changed:
+                    self.mark_page_info_uploaded(page_info)
+                return True, len(changed), f"批量上传页面信息成功，共{len(changed)}条"
+            except Exception as e:
+                if retry < RETRY_COUNT:
+                    continue
+                self.save_local_backup(upload_data)
+                return False, 0, f"批量上传页面信息失败：{str(e)}"
+    
+    def save_page_info_cache(self):
+        """重新读取后合并本次上传的内容哈希再写回，多个工作进程同时运行时不会互相覆盖"""
+        with self.page_info_lock:
+            if not self.page_info_updates:
+                return
+            try:
+                cache = self.load_page_info_cache()
+                cache.update(self.page_info_updates)
+                temp_path = self.page_info_cache_path + ".tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, self.page_info_cache_path)
+                self.page_info_updates = {}
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 页面信息缓存保存失败: {str(e)}")
+    
     def save_local_backup(self, data):
         """本地备份上传失败的数据"""
         backup_dir = os.path.join(utils.get_exe_directory(), "upload_backups")
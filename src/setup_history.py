@@ -0,0 +1,103 @@
+import os
+import json
+from datetime import datetime
+from .utils import utils
+
+# 页面加载耗时历史配置
+SETUP_HISTORY_FILE_NAME = "setup_history.json"
+DEFAULT_HISTORY_SIZE = 20               # 每个任务保留的最近加载耗时样本数
+DEFAULT_SAFETY_MARGIN = 10.0            # 页面须在开始时间前至少该秒数就绪
+DEFAULT_SETUP_ESTIMATE_MS = 15000       # 没有任何历史记录时单次加载尝试的耗时估计（毫秒）
+PREDICTION_PERCENTILE = 0.9             # 按历史耗时的该分位数预测，宁早勿晚
+
+class SetupHistory:
+    """页面加载耗时历史：按浏览器类型和任务记录每次加载的耗时（导航、选择器等待、重试次数），预测页面需要多久才能就绪"""
+
+    def __init__(self, path=None, history_size=DEFAULT_HISTORY_SIZE, safety_margin=DEFAULT_SAFETY_MARGIN,
+                 default_estimate_ms=DEFAULT_SETUP_ESTIMATE_MS):
+        self.path = path or os.path.join(utils.get_exe_directory(), SETUP_HISTORY_FILE_NAME)
+        self.history_size = max(1, int(history_size))
+        self.safety_margin = safety_margin
+        self.default_estimate_ms = default_estimate_ms
+        self.pending = []
+        self.history = self.read()
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的jit_setup配置创建耗时历史"""
+        return cls(
+            path=config.get("path"),
+            history_size=config.get("history_size", DEFAULT_HISTORY_SIZE),
+            safety_margin=config.get("safety_margin", DEFAULT_SAFETY_MARGIN),
+            default_estimate_ms=config.get("default_estimate_ms", DEFAULT_SETUP_ESTIMATE_MS)
+        )
+
+    def read(self):
+        """读取历史文件，不存在或损坏时返回空历史"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def samples(self, browser_type, task_id=None):
+        """该任务（不指定时为该浏览器类型所有任务）成功加载时单次尝试的就绪耗时；整次加载耗时包含重试和重试等待，失败的加载没有就绪耗时，均不参与预测"""
+        tasks = self.history.get(browser_type, {})
+        task_samples = tasks.get(task_id, []) if task_id is not None else [sample for samples in tasks.values() for sample in samples]
+        return [sample["selector_ms"] for sample in task_samples if sample.get("success") and "selector_ms" in sample]
+
+    def recent_ready_ms(self, browser_type, limit):
+        """该浏览器类型最近成功加载的按钮就绪耗时，用于计算对冲阈值"""
+        samples = [sample for samples in self.history.get(browser_type, {}).values() for sample in samples
+                   if sample.get("success") and "selector_ms" in sample]
+        samples.sort(key=lambda sample: sample["recorded_at"])
+        return [sample["selector_ms"] for sample in samples[-limit:]]
+
+    @staticmethod
+    def percentile(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def predict(self, browser_type, task_id):
+        """预测单次加载尝试的耗时（毫秒）：依次使用该任务、该浏览器类型的历史，都没有时使用默认估计"""
+        samples = self.samples(browser_type, task_id) or self.samples(browser_type)
+        return self.percentile(samples, PREDICTION_PERCENTILE) if samples else self.default_estimate_ms
+
+    def budget_ms(self, browser_type, task_id, max_attempts, retry_delay):
+        """加载时间预算（毫秒）：单次尝试的预测耗时乘以尝试次数，并计入尝试之间的重试等待，最后一次尝试也能在开始前就绪"""
+        attempts = max(1, int(max_attempts))
+        return self.predict(browser_type, task_id) * attempts + retry_delay * 1000 * (attempts - 1)
+
+    def append(self, history, browser_type, task_id, sample):
+        samples = history.setdefault(browser_type, {}).setdefault(task_id, [])
+        samples.append(sample)
+        del samples[:-self.history_size]
+
+    def record(self, browser_type, task_id, setup_ms, timings=None, success=True):
+        """记录一次页面加载，timings为浏览器记录的导航、信息接口、选择器耗时和尝试次数"""
+        sample = {
+            "setup_ms": round(setup_ms, 1),
+            "success": success,
+            "recorded_at": datetime.now().isoformat(timespec="seconds")
+        }
+        sample.update(timings or {})
+        self.append(self.history, browser_type, task_id, sample)
+        self.pending.append((browser_type, task_id, sample))
+
+    def save(self):
+        """重新读取文件并合并本次新增的样本后写回，多个工作进程同时运行时不会互相覆盖"""
+        if not self.pending:
+            return
+        try:
+            history = self.read()
+            for browser_type, task_id, sample in self.pending:
+                self.append(history, browser_type, task_id, sample)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(history, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+            self.history = history
+            self.pending = []
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 页面加载耗时历史保存失败: {str(e)}")
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+from datetime import datetime
+from .utils import utils
+from .browser import CDP_BROWSER_TYPE
+
+# 登录状态导出配置
+STORAGE_STATE_FILE_NAME = "storage_state.json"
+DEFAULT_CONTEXT_COUNT = 2                       # 由导出状态创建的轻量上下文数量
+DEFAULT_REFRESH_MARGIN = 24 * 3600              # 登录Cookie剩余有效期小于该值时重新导出（秒）
+DEFAULT_MAX_STATE_AGE = 12 * 3600               # 导出文件超过该时长时重新导出（秒），同步站点刷新的Cookie和localStorage
+AUTH_COOKIE_NAMES = ["SESSDATA", "bili_jct", "DedeUserID"]
+
+class StorageStateManager:
+    """登录状态导出管理：从已登录的持久化配置导出Cookie和localStorage，临近过期时自动重新导出"""
+
+    def __init__(self, path=None, context_count=DEFAULT_CONTEXT_COUNT, refresh_margin=DEFAULT_REFRESH_MARGIN,
+                 max_state_age=DEFAULT_MAX_STATE_AGE, allow_export=True):
+        self.path = path or os.path.join(utils.get_exe_directory(), STORAGE_STATE_FILE_NAME)
+        self.context_count = max(1, int(context_count))
+        self.refresh_margin = refresh_margin
+        self.max_state_age = max_state_age
+        # 没有真实浏览器配置目录的账号不能重新导出，否则会用空配置的未登录状态覆盖登录文件
+        self.allow_export = allow_export
+
+    @classmethod
+    def from_config(cls, config):
+        """从server_config中的storage_state配置创建管理器"""
+        return cls(
+            path=config.get("path"),
+            context_count=config.get("context_count", DEFAULT_CONTEXT_COUNT),
+            refresh_margin=config.get("refresh_margin", DEFAULT_REFRESH_MARGIN),
+            max_state_age=config.get("max_state_age", DEFAULT_MAX_STATE_AGE),
+            allow_export=config.get("allow_export", True)
+        )
+
+    def load(self):
+        """读取导出的登录状态，不存在或损坏时返回None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    @staticmethod
+    def auth_cookie_expiry(state):
+        """登录Cookie中最早的过期时间（Unix时间戳），会话Cookie或未找到时返回None"""
+        expiries = [cookie["expires"] for cookie in state.get("cookies", [])
+                    if cookie.get("name") in AUTH_COOKIE_NAMES and cookie.get("expires", -1) > 0]
+        return min(expiries) if expiries else None
+
+    @staticmethod
+    def has_login_cookie(state):
+        return bool(state) and any(cookie.get("name") == "SESSDATA" for cookie in state.get("cookies", []))
+
+    def needs_refresh(self, state=None):
+        """判断是否需要重新导出，返回(是否需要, 原因)"""
+        state = state if state is not None else self.load()
+        if not state:
+            return True, "尚未导出登录状态"
+        if not self.has_login_cookie(state):
+            return True, "导出的登录状态中没有登录Cookie"
+        expiry = self.auth_cookie_expiry(state)
+        if expiry is not None and expiry - time.time() < self.refresh_margin:
+            return True, f"登录Cookie将于 {datetime.fromtimestamp(expiry).strftime('%Y-%m-%d %H:%M')} 过期"
+        if time.time() - os.path.getmtime(self.path) > self.max_state_age:
+            return True, "导出的登录状态已超过最长保存时间"
+        return False, None
+
+    async def export(self, context):
+        """从已登录的上下文导出登录状态到文件，导出的状态中没有登录Cookie时不覆盖原文件并抛出RuntimeError"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = self.path + ".tmp"
+        state = await context.storage_state(path=temp_path)
+        if not self.has_login_cookie(state):
+            os.remove(temp_path)
+            raise RuntimeError("浏览器配置中没有登录Cookie，未覆盖原登录状态文件，请先完成B站登录")
+        os.replace(temp_path, self.path)
+        expiry = self.auth_cookie_expiry(state) if state else None
+        if expiry is not None and expiry - time.time() < self.refresh_margin:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 浏览器配置中的登录Cookie即将过期，请重新登录B站")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 登录状态已导出: {self.path}，{len(state.get('cookies', [])) if state else 0}个Cookie")
+
+    async def ensure(self, browser, playwright=None, runtime=None):
+        """确保登录状态文件可用，需要时从持久化配置重新导出；不能导出或导出失败时继续使用原文件中的登录状态"""
+        refresh, reason = self.needs_refresh()
+        if not refresh:
+            return self.path
+        if not self.allow_export:
+            return self.keep_existing(reason, "该账号没有浏览器配置目录，无法重新导出")
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 重新导出登录状态: {reason}")
+        try:
+            await self.export_from_profile(browser, playwright, runtime)
+        except Exception as e:
+            return self.keep_existing(reason, f"重新导出失败: {str(e)}")
+        return self.path
+
+    def keep_existing(self, reason, message):
+        """原文件中仍有登录Cookie时提示后继续使用，否则抛出RuntimeError，避免以未登录状态运行"""
+        if not self.has_login_cookie(self.load()):
+            raise RuntimeError(f"登录状态不可用（{reason}），{message}")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ {reason}，{message}，继续使用现有登录状态: {self.path}")
+        return self.path
+
+    async def export_from_profile(self, browser, playwright=None, runtime=None):
+        """从持久化配置（常驻运行时的上下文或连接的浏览器）导出登录状态"""
+        if runtime:
+            context, _ = await runtime.acquire(browser.browser_type, browser.browser_executable_path, browser.cookies_dir, browser.cdp_endpoint)
+            await self.export(context)
+            return
+
+        if browser.browser_type == CDP_BROWSER_TYPE:
+            # 连接模式：从已运行浏览器的上下文导出，导出后只断开连接
+            cdp_browser, context = await browser.connect_over_cdp(playwright)
+            try:
+                await self.export(context)
+            finally:
+                await cdp_browser.close()
+            return
+
+        context = await browser.launch_browser(playwright, headless=True)
+        try:
+            await self.export(context)
+        finally:
+            await context.close()
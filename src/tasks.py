@@ -1,21 +1,53 @@
 import os
 import json
+import time
+import queue
+import random
 import asyncio
-from datetime import datetime
+import functools
+import multiprocessing
+from datetime import datetime, timedelta
 from .utils import utils
-from .browser import Browser
-from .server import Server
+from .browser import (Browser, DEFAULT_PAGE_READY_TIMEOUT, CDP_BROWSER_TYPE, PRE_START_VERIFY_TIMEOUT,
+                      DEFAULT_HEDGE_THRESHOLD_MS, HEDGE_MIN_THRESHOLD_MS, HEDGE_SAMPLE_WINDOW, LOAD_RETRY_DELAY)
+from .server import Server, CLOCK_SYNC_SAMPLES, MISSION_INFO_API_PATH, build_receive_code_table
+from .clicker import DEFAULT_CLICK_BACKEND, DEFAULT_MAX_IN_FLIGHT
+from .rate_control import RateController, MIN_INTERVAL_FACTOR, MAX_INTERVAL_FACTOR
+from .routing import RouteRules
+from .asset_cache import AssetCache
+from .storage_state import StorageStateManager
+from .setup_history import SetupHistory
+from .selector_cache import SelectorCache
 
 # 默认配置
 DEFAULT_START_TIME = "00:29:57"
 DEFAULT_CLICK_INTERVAL = 0.05
 DEFAULT_CLICK_DURATION = 10.0
+DEFAULT_PAGE_SETUP_CONCURRENCY = 4
+DEFAULT_PAGE_SETUP_JITTER = 0.5
+DEFAULT_WORKER_PROCESSES = 1    # 大于1时把任务分片到多个工作进程执行
+SHARD_POLL_INTERVAL = 0.5       # 协调进程检查停止标志和工作进程状态的间隔（秒）
+DEFAULT_WAVE_LEAD_TIME = 60.0   # 波次开始前多少秒加载本波次的页面
+DEFAULT_WAVE_WINDOW = 0.0       # 开始时间相差不超过该值（秒）的任务归入同一波次
+DEFAULT_PRE_START_OFFSETS = [5.0]   # 开始前复查页面的时间点（开始前多少秒）
+DEFAULT_RELOAD_ESTIMATE = 5.0       # 没有该页面的就绪耗时记录时，重新加载的估计耗时（秒）
+DEFAULT_PREWARM_LEAD_TIME = 3.0     # 开始前多少秒预热到接口域名的连接
+DEFAULT_PREWARM_ORIGIN = "https://api.bilibili.com"
+DEFAULT_PREWARM_CONTROL_EVERY = 0   # 每隔几个任务留一个不预热的对照任务，默认0表示全部预热，需要对比时在配置中开启
+PREWARM_TIMEOUT = 2.0               # 预热请求的最长等待（秒），不会推迟开始时间
 
 class Tasks:
     def __init__(self):
         self.task_configs = {}
         self.selected_tasks = []
         self.reward_result_cache = {}
+        self.task_metrics = {}
+        self.run_stats = {}
+        self.setup_history = None
+        self.setup_start_times = {}
+        self.pre_start_config = {}
+        self.prewarm_config = {}
+        self.prewarm_groups = {}
         self.task_config_path = os.path.join(utils.get_exe_directory(), "task_configs.json")
         self.load_task_configs()
     
@@ -59,7 +91,9 @@ class Tasks:
             self.task_configs[task_id] = {
                 'start_time': utils.parse_time_input(DEFAULT_START_TIME),
                 'interval': DEFAULT_CLICK_INTERVAL,
-                'duration': DEFAULT_CLICK_DURATION
+                'duration': DEFAULT_CLICK_DURATION,
+                'click_backend': DEFAULT_CLICK_BACKEND,
+                'max_in_flight': DEFAULT_MAX_IN_FLIGHT
             }
             if task_id not in self.selected_tasks:
                 self.selected_tasks.append(task_id)
@@ -77,14 +111,24 @@ class Tasks:
             del self.reward_result_cache[task_id]
         return True, "任务删除成功"
     
-    def update_task(self, task_id, start_time, interval, duration):
+    def update_task(self, task_id, start_time, interval, duration, click_backend=None, max_in_flight=None):
         """更新任务配置"""
         try:
             parsed_time = utils.parse_time_input(start_time)
+            current_config = self.task_configs.get(task_id, {})
+            if click_backend is None:
+                click_backend = current_config.get('click_backend', DEFAULT_CLICK_BACKEND)
+            if max_in_flight is None:
+                max_in_flight = current_config.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT)
+            max_in_flight = int(max_in_flight)
+            if max_in_flight < 1:
+                raise ValueError("最大并发点击数必须大于等于1")
             self.task_configs[task_id] = {
                 'start_time': parsed_time,
                 'interval': float(interval),
-                'duration': float(duration)
+                'duration': float(duration),
+                'click_backend': click_backend,
+                'max_in_flight': max_in_flight
             }
             return True, "任务配置更新成功"
         except ValueError as e:
@@ -96,7 +140,9 @@ class Tasks:
             self.task_configs[task_id] = {
                 'start_time': utils.parse_time_input(DEFAULT_START_TIME),
                 'interval': DEFAULT_CLICK_INTERVAL,
-                'duration': DEFAULT_CLICK_DURATION
+                'duration': DEFAULT_CLICK_DURATION,
+                'click_backend': DEFAULT_CLICK_BACKEND,
+                'max_in_flight': DEFAULT_MAX_IN_FLIGHT
             }
         return True, "已应用默认值到所有任务"
     
@@ -107,10 +153,20 @@ class Tasks:
         self.reward_result_cache.clear()
         return True, "已清空所有任务"
     
-    async def execute_tasks(self, browser_type, browser_executable_path, cookies_dir, server_url, running_flag):
-        """执行所有任务"""
+    async def execute_tasks(self, browser_type, browser_executable_path, cookies_dir, server_url, running_flag, runtime=None, shard=None):
+        """执行所有任务；传入常驻浏览器运行时时复用其上下文，不再每次启动浏览器；shard为工作进程执行分片时由协调进程传入的参数"""
+        from .config import config_manager
+        accounts = config_manager.get_accounts()
+        if shard is None and accounts:
+            return await self.execute_accounts(browser_type, browser_executable_path, server_url, running_flag, accounts)
+        worker_processes = int(config_manager.server_config.get("worker_processes", DEFAULT_WORKER_PROCESSES))
+        if shard is None and worker_processes > 1 and len(self.selected_tasks) > 1:
+            return await self.execute_sharded(browser_type, browser_executable_path, cookies_dir, server_url, running_flag, runtime, worker_processes)
+        
         try:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始执行任务...")
+            self.task_metrics = {}
+            self.run_stats = {}
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器类型: {browser_type}")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器路径: {browser_executable_path or '默认路径'}")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Cookie目录: {cookies_dir}")
@@ -118,76 +174,231 @@ class Tasks:
             
             # 初始化浏览器
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 初始化浏览器...")
-            browser = Browser(browser_type, browser_executable_path, cookies_dir)
-            playwright = await browser.setup_browser()
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Playwright初始化成功")
-            context = await browser.launch_browser(playwright)
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器启动成功")
+            browser = Browser(browser_type, browser_executable_path, cookies_dir, config_manager.browser_config.get("cdp_endpoint"))
+            launch_start = time.perf_counter()
+            context_mode = (shard or {}).get("context_mode") or config_manager.server_config.get("context_mode", "persistent")
+            if context_mode == "storage_state":
+                # 由导出的登录状态创建多个轻量上下文，不再独占持久化配置目录
+                storage_state_config = dict(config_manager.server_config.get("storage_state", {}))
+                if shard and shard.get("storage_state_path"):
+                    storage_state_config["path"] = shard["storage_state_path"]
+                    storage_state_config["allow_export"] = shard.get("storage_state_export", True)
+                storage_state = StorageStateManager.from_config(storage_state_config)
+                if runtime:
+                    storage_state_path = await storage_state.ensure(browser, runtime=runtime)
+                    plain_browser, launched = await runtime.acquire_plain_browser(browser_type, browser_executable_path)
+                else:
+                    playwright = await browser.setup_browser()
+                    storage_state_path = await storage_state.ensure(browser, playwright)
+                    plain_browser = await browser.launch_plain_browser(playwright)
+                context_count = min(storage_state.context_count, max(1, len(self.selected_tasks)))
+                contexts = await browser.open_storage_state_contexts(plain_browser, storage_state_path, context_count)
+                context = contexts[0]
+                await browser.install_response_dispatcher(context, self.reward_result_cache)
+                for extra_context in contexts[1:]:
+                    await browser.attach_response_dispatcher(extra_context)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 已由登录状态创建{len(contexts)}个轻量上下文")
+            elif runtime:
+                context, launched = await runtime.acquire(browser_type, browser_executable_path, cookies_dir, browser.cdp_endpoint)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {'浏览器运行时已重新启动' if launched else '复用常驻浏览器运行时'}")
+                await browser.install_response_dispatcher(context, self.reward_result_cache, runtime.dispatcher)
+                runtime.dispatcher = browser.dispatcher
+                contexts = [context]
+            else:
+                playwright = await browser.setup_browser()
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Playwright初始化成功")
+                if browser_type == CDP_BROWSER_TYPE:
+                    cdp_browser, context = await browser.connect_over_cdp(playwright)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 已连接浏览器: {browser.cdp_endpoint}")
+                else:
+                    context = await browser.launch_browser(playwright)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器启动成功")
+                await browser.install_response_dispatcher(context, self.reward_result_cache)
+                contexts = [context]
+            self.run_stats["context_mode"] = context_mode
+            self.run_stats["browser_acquire_ms"] = round((time.perf_counter() - launch_start) * 1000, 1)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 领取接口响应分发器已安装，获取浏览器耗时 {self.run_stats['browser_acquire_ms']:.0f}ms")
             
             # 初始化服务端通信
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 初始化服务端通信...")
             server = Server(server_url)
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 服务端通信初始化成功")
             
+            # 与服务端校时，开始时间按服务端时间调度；分片和账号从不自行校时，直接使用协调方的校时结果，
+            # 协调方校时失败或未启用时统一使用本机时间（偏差0），保证同一开始时间在各分片同时释放
+            if shard:
+                browser.scheduler.clock_offset = shard.get("clock_offset") or 0.0
+            else:
+                clock_offset = await self.sync_clock(server, config_manager)
+                if clock_offset is not None:
+                    browser.scheduler.clock_offset = clock_offset
+            
             # 从配置文件获取配置
-            from .config import config_manager
             reward_base_url = config_manager.server_config.get("reward_base_url", "https://www.bilibili.com/blackboard/era-award-exchange.html")
             reward_claim_selector = config_manager.server_config.get("reward_claim_selector", '//*[@id="app"]/div/div[3]/section[2]/div[1]')
             max_reload_attempts = config_manager.server_config.get("context_retry_count", 3)
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 配置信息: 基础URL={reward_base_url}, 选择器={reward_claim_selector}, 最大重试次数={max_reload_attempts}")
             
-            # 加载任务页面
-            task_pages = {}
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始加载任务页面，共{len(self.selected_tasks)}个任务")
-            for i, task_id in enumerate(self.selected_tasks):
-                if not running_flag():
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务执行被用户终止")
-                    break
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 加载任务 {i+1}/{len(self.selected_tasks)}: {task_id}")
-                page, success = await browser.setup_task_page(
-                    context, reward_base_url, task_id, reward_claim_selector, max_reload_attempts, i * 2, running_flag
-                )
-                if success:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 任务页面加载成功: {task_id}")
-                    # 绑定API响应监控
-                    await browser.monitor_api_response(page, task_id, self.reward_result_cache)
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ API响应监控已绑定: {task_id}")
-                    
-                    # 提取页面信息并上传
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 提取页面信息: {task_id}")
-                    page_info = await browser.extract_page_info(page, task_id)
-                    if page_info:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 页面信息提取成功，正在上传...")
-                        upload_success = server.upload_page_info(page_info)
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 页面信息上传: {'成功' if upload_success else '失败'}")
-                    
-                    task_pages[task_id] = page
+            # 根据领取接口响应自适应调整点击间隔
+            browser.receive_code_table = build_receive_code_table(config_manager.server_config.get("receive_code_table"))
+            browser.page_ready_timeout = config_manager.server_config.get("page_ready_timeout", DEFAULT_PAGE_READY_TIMEOUT)
+            rate_control_config = config_manager.server_config.get("rate_control", {})
+            if rate_control_config.get("enabled", False):
+                browser.rate_controller = RateController.from_config(rate_control_config)
+                if shard and browser.rate_controller.global_max_rate:
+                    # 总速率上限按各分片的任务数分配
+                    browser.rate_controller.global_max_rate *= shard.get("rate_share", 1.0)
+                for task_id in self.selected_tasks:
+                    if task_id in self.task_configs:
+                        browser.rate_controller.register_task(task_id, self.task_configs[task_id]['interval'])
+                if browser.rate_controller.min_interval is None or browser.rate_controller.max_interval is None:
+                    interval_range = f"任务间隔的 {MIN_INTERVAL_FACTOR} ~ {MAX_INTERVAL_FACTOR} 倍"
                 else:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 任务页面加载失败: {task_id}")
+                    interval_range = f"{browser.rate_controller.min_interval}s ~ {browser.rate_controller.max_interval}s"
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 自适应速率控制已启用: 间隔范围 {interval_range}")
+            
+            # SPA公共脚本、样式从本地内容寻址缓存返回（需在配置中开启；先注册，拦截规则优先生效）
+            browser.asset_cache = None
+            asset_cache_config = config_manager.server_config.get("asset_cache", {})
+            if asset_cache_config.get("enabled", False):
+                browser.asset_cache = AssetCache.from_config(asset_cache_config)
+                self.run_stats["asset_cache_state"] = "cold" if browser.asset_cache.is_cold else "warm"
+                for installed_context in contexts:
+                    await browser.asset_cache.install(installed_context)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 静态资源缓存已启用: {len(browser.asset_cache.index)}个缓存条目（{self.run_stats['asset_cache_state']}）")
+            
+            # 拦截任务页面用不到的图片、字体、媒体和埋点请求（需在配置中开启）
+            route_rules = None
+            route_rules_config = config_manager.server_config.get("route_rules", {})
+            if route_rules_config.get("enabled", False):
+                route_rules = RouteRules.from_config(route_rules_config)
+                for installed_context in contexts:
+                    await route_rules.install(installed_context)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 请求路由规则已启用: 拦截资源类型 {sorted(route_rules.block_resource_types)}")
+            
+            # 按开始时间分波次：每个波次在开始前lead_time秒才加载页面，结束后立即关闭
+            wave_config = config_manager.server_config.get("wave_scheduling", {})
+            if wave_config.get("enabled", True):
+                waves = self.group_task_waves(self.selected_tasks, wave_config.get("window", DEFAULT_WAVE_WINDOW))
+                lead_time = wave_config.get("lead_time", DEFAULT_WAVE_LEAD_TIME)
+            else:
+                waves = [(None, [task_id for task_id in self.selected_tasks if task_id in self.task_configs])]
+                lead_time = None
+            
+            # 按历史加载耗时推算每个页面的开始加载时间，为所有重试留出时间，使页面最迟在开始时间前safety_margin秒就绪
+            self.setup_history = None
+            self.setup_start_times = {}
+            jit_config = config_manager.server_config.get("jit_setup", {})
+            if jit_config.get("enabled", True):
+                self.setup_history = SetupHistory.from_config(jit_config)
+                for task_id in self.selected_tasks:
+                    if task_id in self.task_configs:
+                        predicted_ms = self.setup_history.predict(browser.browser_type, task_id)
+                        budget_ms = self.setup_history.budget_ms(browser.browser_type, task_id, max_reload_attempts, LOAD_RETRY_DELAY)
+                        self.task_metrics.setdefault(task_id, {})["predicted_setup_ms"] = round(predicted_ms, 1)
+                        self.task_metrics[task_id]["setup_budget_ms"] = round(budget_ms, 1)
+                        self.setup_start_times[task_id] = self.task_configs[task_id]['start_time'] - timedelta(
+                            milliseconds=budget_ms, seconds=self.setup_history.safety_margin)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 即时加载已启用: 按历史加载耗时×{max_reload_attempts}次尝试推算开始加载时间，就绪余量 {self.setup_history.safety_margin}秒")
+            # 对冲加载：页面超过最近就绪耗时的p90仍未就绪时并行加载第二个页面
+            hedge_config = config_manager.server_config.get("hedged_loading", {})
+            browser.hedge_enabled = hedge_config.get("enabled", True)
+            browser.hedge_default_threshold_ms = hedge_config.get("default_threshold_ms", DEFAULT_HEDGE_THRESHOLD_MS)
+            browser.hedge_min_threshold_ms = hedge_config.get("min_threshold_ms", HEDGE_MIN_THRESHOLD_MS)
+            if browser.hedge_enabled and self.setup_history:
+                browser.recent_ready_ms = self.setup_history.recent_ready_ms(browser.browser_type, HEDGE_SAMPLE_WINDOW)
+            if browser.hedge_enabled:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 对冲加载已启用: 当前阈值 {browser.get_hedge_threshold():.0f}ms（{len(browser.recent_ready_ms)}个历史样本）")
+            
+            # 领取按钮选择器回退链：配置的选择器优先，布局变化时一次探测即可回退到上次可用的选择器和其他候选
+            selector_config = config_manager.server_config.get("selector_fallback", {})
+            if selector_config.get("enabled", True):
+                browser.selector_cache = SelectorCache.from_config(selector_config)
+                if browser.selector_cache.candidates:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 选择器回退已启用: {len(browser.selector_cache.candidates)}个候选选择器")
+                else:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 选择器回退未生效: 未配置候选选择器（app_config.selector_fallback.candidates），页面布局变化时仍需等待所有加载尝试超时")
+            
+            # 开始前的T-minus复查：按钮失效或页面无响应时，来得及才原地重新加载
+            self.pre_start_config = config_manager.server_config.get("pre_start_check", {})
+            if self.pre_start_config.get("enabled", True):
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始前复查已启用: 开始前 {self.pre_start_config.get('offsets', DEFAULT_PRE_START_OFFSETS)}秒 复查页面")
+            
+            # 开始前预热到领取接口域名的连接，避免第一次领取请求承担DNS、TCP和TLS握手
+            self.prewarm_config = config_manager.server_config.get("prewarm", {})
+            self.prewarm_groups = {}
+            if self.prewarm_config.get("enabled", True):
+                # 配置了control_every时按任务顺序分组，对照组不预热，用于比较首次领取请求的响应耗时
+                control_every = int(self.prewarm_config.get("control_every", DEFAULT_PREWARM_CONTROL_EVERY))
+                for index, task_id in enumerate(task_id for task_id in self.selected_tasks if task_id in self.task_configs):
+                    self.prewarm_groups[task_id] = "control" if control_every > 0 and index % control_every == control_every - 1 else "prewarm"
+                    self.task_metrics.setdefault(task_id, {})["prewarm_group"] = self.prewarm_groups[task_id]
+                control_count = list(self.prewarm_groups.values()).count("control")
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 连接预热已启用: 开始前 {self.prewarm_config.get('lead_time', DEFAULT_PREWARM_LEAD_TIME)}秒 预热 {self.prewarm_config.get('origin', DEFAULT_PREWARM_ORIGIN)}，对照组（不预热）{control_count}个任务")
+            
+            page_args = (
+                reward_base_url, reward_claim_selector, max_reload_attempts, running_flag,
+                config_manager.server_config.get("page_setup_concurrency", DEFAULT_PAGE_SETUP_CONCURRENCY),
+                config_manager.server_config.get("page_setup_jitter", DEFAULT_PAGE_SETUP_JITTER),
+                (shard or {}).get("setup_semaphore")
+            )
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务分为{len(waves)}个波次执行" + (f"，每个波次提前 {lead_time}秒 加载页面" if lead_time is not None and not self.setup_start_times else ""))
             
-            if not task_pages:
+            results = {}
+            self.open_page_count = 0
+            browser.page_count_listener = self.track_open_pages
+            self.setup_spans = []
+            self.run_stats["wave_count"] = len(waves)
+            self.run_stats["peak_open_pages"] = 0
+            ready_counts = await asyncio.gather(*(
+                self.run_task_wave(browser, contexts, server, wave_start, wave_task_ids, lead_time, page_args, results, running_flag)
+                for wave_start, wave_task_ids in waves
+            ))
+            
+            if not any(ready_counts):
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 所有TaskID初始化失败，无法继续")
                 return False, "所有TaskID初始化失败，无法继续"
             
-            # 执行任务
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始执行任务，共{len(task_pages)}个任务页面")
-            results = {}
-            task_coroutines = []
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 所有任务执行完成，同时打开的任务页面最多 {self.run_stats['peak_open_pages']} 个（以页面数作为内存占用的代理指标，未采样进程内存）")
+            if self.run_stats.get("page_info_uploaded") or self.run_stats.get("page_info_unchanged"):
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 页面信息: 上传 {self.run_stats.get('page_info_uploaded', 0)} 个，未变化跳过 {self.run_stats.get('page_info_unchanged', 0)} 个")
+                await asyncio.get_running_loop().run_in_executor(None, server.save_page_info_cache)
+            if browser.selector_cache:
+                self.run_stats["selector_fallbacks"] = browser.selector_cache.fallbacks
+                if browser.selector_cache.fallbacks:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ {browser.selector_cache.fallbacks}个页面回退到了候选选择器，页面布局可能已变化")
+                await asyncio.get_running_loop().run_in_executor(None, browser.selector_cache.save)
+            if browser.hedge_enabled:
+                self.run_stats["hedges_fired"] = browser.hedge_stats["fired"]
+                self.run_stats["hedges_won"] = browser.hedge_stats["won"]
+                self.run_stats["hedges_skipped"] = browser.hedge_stats["skipped"]
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 对冲加载: 触发 {browser.hedge_stats['fired']} 次，对冲页面先就绪 {browser.hedge_stats['won']} 次，名额已满跳过 {browser.hedge_stats['skipped']} 次")
+            self.print_pre_start_report()
+            if self.setup_history:
+                self.print_setup_prediction_report()
+                await asyncio.get_running_loop().run_in_executor(None, self.setup_history.save)
+            release_report = browser.scheduler.get_report()
+            if release_report:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始时间释放误差: {release_report['count']}个任务，平均 {release_report['mean_ms']:.2f}ms，最大 {release_report['max_ms']:.2f}ms")
+            self.print_click_backend_report()
             
-            for task_id, config in self.task_configs.items():
-                if task_id in task_pages and running_flag():
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 准备执行任务: {task_id}, 开始时间: {config['start_time'].strftime('%H:%M:%S')}, 间隔: {config['interval']}s, 持续时间: {config['duration']}s")
-                    task_coroutines.append(
-                        self.run_single_task(
-                            browser, task_pages[task_id], task_id, reward_claim_selector,
-                            config['start_time'], config['interval'], config['duration'], results, running_flag
-                        )
-                    )
+            # 处理完已收到的领取接口响应，保证结果缓存完整
+            await browser.dispatcher.close()
+            self.print_first_response_report(browser)
             
-            if task_coroutines:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始并发执行{len(task_coroutines)}个任务")
-                await asyncio.gather(*task_coroutines)
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 所有任务执行完成")
+            if route_rules:
+                route_rules.print_report()
+                route_report = route_rules.get_report()
+                self.run_stats["blocked_requests"] = route_report["blocked_requests"]
+                self.run_stats["blocked_bytes_estimate"] = route_report["blocked_bytes_estimate"]
+            
+            if browser.asset_cache:
+                await browser.asset_cache.close()
+                browser.asset_cache.print_report()
+                cache_report = browser.asset_cache.get_report()
+                self.run_stats["asset_cache_hits"] = cache_report["hits"]
+                self.run_stats["asset_cache_misses"] = cache_report["misses"]
+                self.run_stats["asset_cache_bytes_served"] = cache_report["bytes_served"]
             
             # 确保每个任务都有结果记录
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 整理任务执行结果...")
@@ -204,9 +415,19 @@ class Tasks:
                         "device_name": utils.get_windows_device_name()
                     }
             
+            # 合并本次运行的任务指标
+            for task_id, metrics in self.task_metrics.items():
+                if task_id in self.reward_result_cache:
+                    self.reward_result_cache[task_id].update(metrics)
+            
+            # 工作进程不上传，结果交回协调进程合并后统一上传
+            if shard:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 分片 {shard.get('index')} 执行完成，共{len(self.reward_result_cache)}个结果")
+                return True, "分片任务执行完成"
+            
             # 批量上传结果
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 批量上传任务结果，共{len(self.reward_result_cache)}个结果")
-            upload_success, upload_message = server.batch_upload_results(self.reward_result_cache, self.task_configs)
+            upload_success, upload_message = server.batch_upload_results(self.reward_result_cache, self.task_configs, self.run_stats)
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 结果上传: {'成功' if upload_success else '失败'} - {upload_message}")
             
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务执行完成")
@@ -219,7 +440,42 @@ class Tasks:
             return False, f"任务执行错误: {str(e)}"
         finally:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 清理资源...")
-            if 'context' in locals():
+            if locals().get('context_mode') == "storage_state" and 'contexts' in locals():
+                # 轻量上下文每次运行重新创建，常驻运行时只保留浏览器进程
+                if browser.dispatcher:
+                    await browser.dispatcher.close()
+                for opened_context in contexts:
+                    try:
+                        await opened_context.close()
+                    except Exception:
+                        pass
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 轻量上下文已关闭")
+                if not runtime:
+                    try:
+                        await plain_browser.close()
+                    except Exception as e:
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 关闭浏览器失败: {str(e)}")
+            elif runtime and 'context' in locals():
+                # 常驻运行时：只撤销本次运行注册的路由并关闭任务页面，上下文留给下次运行
+                try:
+                    if browser.dispatcher:
+                        await browser.dispatcher.close()
+                    for installed_routes in (locals().get('route_rules'), browser.asset_cache):
+                        if installed_routes:
+                            await installed_routes.uninstall(context)
+                    await runtime.release(browser)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务页面已关闭，浏览器运行时保持运行")
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 释放浏览器运行时失败: {str(e)}")
+            elif 'cdp_browser' in locals():
+                # 连接模式：只关闭本次打开的页面并断开连接，不关闭用户的浏览器
+                try:
+                    await browser.close_opened_pages()
+                    await cdp_browser.close()
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 已断开与浏览器的连接")
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 断开浏览器连接失败: {str(e)}")
+            elif 'context' in locals():
                 try:
                     await context.close()
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] 浏览器上下文已关闭")
@@ -233,21 +489,538 @@ class Tasks:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] 停止Playwright失败: {str(e)}")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 资源清理完成")
     
-    async def run_single_task(self, browser, page, task_id, target_selector, start_time, interval, duration, results, running_flag):
+    async def sync_clock(self, server, config_manager):
+        """与服务端校时（阻塞请求放到线程池执行），返回时钟偏差（秒），未启用或失败时返回None"""
+        if not config_manager.server_config.get("clock_sync_enabled", True):
+            return None
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 正在与服务端校时...")
+        clock_success, clock_info = await asyncio.get_running_loop().run_in_executor(
+            None, server.estimate_clock_offset, config_manager.server_config.get("clock_sync_samples", CLOCK_SYNC_SAMPLES)
+        )
+        if not clock_success:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 校时失败，使用本机时间: {clock_info['message']}")
+            return None
+        self.run_stats["clock_offset_ms"] = round(clock_info["offset"] * 1000, 3)
+        self.run_stats["clock_uncertainty_ms"] = round(clock_info["uncertainty"] * 1000, 3)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 时钟偏差: {self.run_stats['clock_offset_ms']:+.2f}ms，不确定度: ±{self.run_stats['clock_uncertainty_ms']:.2f}ms（{clock_info['samples']}个样本）")
+        return clock_info["offset"]
+    
+    async def execute_sharded(self, browser_type, browser_executable_path, cookies_dir, server_url, running_flag, runtime, worker_processes):
+        """多进程执行：按开始时间把任务轮流分到多个工作进程，每个进程有独立的事件循环和浏览器，结果合并后统一上传"""
+        from .config import config_manager
+        self.task_metrics = {}
+        self.run_stats = {}
+        task_ids = sorted((task_id for task_id in self.selected_tasks if task_id in self.task_configs),
+                          key=lambda task_id: self.task_configs[task_id]['start_time'])
+        worker_count = min(worker_processes, len(task_ids))
+        shards = [task_ids[index::worker_count] for index in range(worker_count)]
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 多进程执行: {len(task_ids)}个任务分为{worker_count}个分片")
+        
+        # 各工作进程使用同一个时钟偏差，同一开始时间的任务在不同进程中同时释放
+        server = Server(server_url)
+        clock_offset = await self.sync_clock(server, config_manager)
+        
+        # 多个进程不能同时打开同一个持久化配置目录：连接模式各自连接同一个浏览器，其余模式先导出登录状态
+        if browser_type == CDP_BROWSER_TYPE:
+            context_mode = "persistent"
+        else:
+            context_mode = "storage_state"
+            browser = Browser(browser_type, browser_executable_path, cookies_dir, config_manager.browser_config.get("cdp_endpoint"))
+            storage_state = StorageStateManager.from_config(config_manager.server_config.get("storage_state", {}))
+            try:
+                if runtime:
+                    await storage_state.ensure(browser, runtime=runtime)
+                else:
+                    playwright = await browser.setup_browser()
+                    try:
+                        await storage_state.ensure(browser, playwright)
+                    finally:
+                        await playwright.stop()
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 导出登录状态失败: {str(e)}")
+                return False, f"导出登录状态失败: {str(e)}"
+        
+        mp_context = multiprocessing.get_context("spawn")
+        stop_event = mp_context.Event()
+        result_queue = mp_context.Queue()
+        processes = []
+        browser_args = (browser_type, browser_executable_path, cookies_dir, server_url)
+        for index, shard_task_ids in enumerate(shards):
+            shard = {
+                "index": index,
+                "clock_offset": clock_offset,
+                "context_mode": context_mode,
+                "rate_share": len(shard_task_ids) / len(task_ids)
+            }
+            shard_configs = {task_id: self.task_configs[task_id] for task_id in shard_task_ids}
+            process = mp_context.Process(target=run_task_shard, args=(shard, shard_configs, browser_args, stop_event, result_queue), daemon=True)
+            process.start()
+            processes.append(process)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 分片 {index}: 工作进程 {process.pid}，任务 {', '.join(shard_task_ids)}")
+        
+        shard_results = await self.collect_shard_results(processes, stop_event, result_queue, running_flag)
+        
+        # 合并各分片的结果和指标
+        shard_stats = []
+        for index, shard_task_ids in enumerate(shards):
+            if index not in shard_results:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 分片 {index} 未返回结果，工作进程可能已异常退出")
+                for task_id in shard_task_ids:
+                    self.reward_result_cache.setdefault(task_id, {
+                        "task_id": task_id,
+                        "status": "失败",
+                        "message": "工作进程异常退出",
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "device_name": utils.get_windows_device_name()
+                    })
+                continue
+            success, message, result_cache, task_metrics, run_stats = shard_results[index]
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 分片 {index}: {'成功' if success else '失败'} - {message}")
+            self.reward_result_cache.update(result_cache)
+            self.task_metrics.update(task_metrics)
+            shard_stats.append(dict(run_stats, index=index, task_count=len(shard_task_ids)))
+        self.run_stats["worker_processes"] = worker_count
+        self.run_stats["shards"] = shard_stats
+        
+        # 批量上传结果
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 批量上传任务结果，共{len(self.reward_result_cache)}个结果")
+        upload_success, upload_message = server.batch_upload_results(self.reward_result_cache, self.task_configs, self.run_stats)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 结果上传: {'成功' if upload_success else '失败'} - {upload_message}")
+        return True, f"任务执行完成（{worker_count}个工作进程），{upload_message}"
+    
+    async def execute_accounts(self, browser_type, browser_executable_path, server_url, running_flag, accounts):
+        """多账号执行：每个账号使用独立的配置目录（或登录状态）和浏览器上下文，按 账号×任务 并行执行，结果按账号标记后统一上传"""
+        from .config import config_manager
+        self.task_metrics = {}
+        self.run_stats = {}
+        multi_account_config = config_manager.server_config.get("multi_account", {})
+        task_configs = {task_id: self.task_configs[task_id] for task_id in self.selected_tasks if task_id in self.task_configs}
+        
+        # 运行前检查每个账号的登录数据，未登录的账号跳过，避免用空配置目录执行（连接模式的登录数据在已运行的浏览器中）
+        missing_accounts = [account["name"] for account in accounts
+                            if browser_type != CDP_BROWSER_TYPE and not self.has_account_login(account)]
+        if missing_accounts:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ⚠️ 以下账号没有登录数据（Cookie目录为空且没有登录状态文件），已跳过: {', '.join(missing_accounts)}")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 请先用该账号的Cookie目录完成B站登录，或在账号配置中指定storage_state登录状态文件")
+            accounts = [account for account in accounts if account["name"] not in missing_accounts]
+            if not accounts:
+                return False, "所有账号都没有登录数据，请先完成登录"
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 多账号执行: {len(accounts)}个账号 × {len(task_configs)}个任务")
+        
+        # 所有账号共用一次校时结果，同一开始时间的任务同时释放
+        server = Server(server_url)
+        clock_offset = await self.sync_clock(server, config_manager)
+        
+        # 资源上限：同时运行的账号数，以及所有账号合计的页面加载并发数
+        account_semaphore = asyncio.Semaphore(max(1, int(multi_account_config.get("max_parallel_accounts", len(accounts)))))
+        setup_semaphore = asyncio.Semaphore(max(1, int(multi_account_config.get("max_page_setups", DEFAULT_PAGE_SETUP_CONCURRENCY))))
+        
+        async def run_account(account):
+            worker = Tasks()
+            worker.task_configs = dict(task_configs)
+            worker.selected_tasks = list(task_configs)
+            shard = {
+                "index": account["name"],
+                "clock_offset": clock_offset,
+                "context_mode": account["context_mode"],
+                "storage_state_path": account["storage_state"],
+                # 只有Cookie目录确实存在登录数据时才允许从中重新导出登录状态
+                "storage_state_export": self.has_profile(account["cookies_dir"]),
+                "setup_semaphore": setup_semaphore
+            }
+            async with account_semaphore:
+                if not running_flag():
+                    return worker, False, "任务被用户终止"
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 账号 {account['name']}: 开始执行，Cookie目录: {account['cookies_dir']}")
+                success, message = await worker.execute_tasks(
+                    browser_type, browser_executable_path, account["cookies_dir"], server_url, running_flag, shard=shard
+                )
+            return worker, success, message
+        
+        account_results = await asyncio.gather(*(run_account(account) for account in accounts))
+        
+        # 按账号标记并合并结果，同一任务在不同账号下各占一条
+        account_stats = []
+        for account, (worker, success, message) in zip(accounts, account_results):
+            name = account["name"]
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 账号 {name}: {'成功' if success else '失败'} - {message}")
+            for task_id, result in worker.reward_result_cache.items():
+                self.reward_result_cache[f"{task_id}@{name}"] = dict(result, account=name)
+            for task_id, metrics in worker.task_metrics.items():
+                self.task_metrics[f"{task_id}@{name}"] = dict(metrics, account=name)
+            account_stats.append(dict(worker.run_stats, account=name, success=success))
+        self.run_stats["accounts"] = account_stats
+        
+        # 批量上传结果
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 批量上传任务结果，共{len(self.reward_result_cache)}个结果")
+        upload_success, upload_message = server.batch_upload_results(self.reward_result_cache, self.task_configs, self.run_stats)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 结果上传: {'成功' if upload_success else '失败'} - {upload_message}")
+        return True, f"任务执行完成（{len(accounts)}个账号），{upload_message}"
+    
+    @staticmethod
+    def has_account_login(account):
+        """账号有可用的登录状态文件，或Cookie目录存在且不为空"""
+        if account["storage_state"] and os.path.isfile(account["storage_state"]):
+            return True
+        return Tasks.has_profile(account["cookies_dir"])
+    
+    @staticmethod
+    def has_profile(cookies_dir):
+        """Cookie目录存在且不为空，即有真实的浏览器配置"""
+        return os.path.isdir(cookies_dir) and bool(os.listdir(cookies_dir))
+    
+    async def collect_shard_results(self, processes, stop_event, result_queue, running_flag):
+        """等待各工作进程交回结果；用户停止时通知所有工作进程，进程异常退出时不再等待其结果"""
+        loop = asyncio.get_running_loop()
+        shard_results = {}
+        while len(shard_results) < len(processes):
+            if not running_flag() and not stop_event.is_set():
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务执行被用户终止，通知所有工作进程停止")
+                stop_event.set()
+            try:
+                result = await loop.run_in_executor(None, functools.partial(result_queue.get, timeout=SHARD_POLL_INTERVAL))
+                shard_results[result[0]] = result[1:]
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and result_queue.empty():
+                    break
+        
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        return shard_results
+    
+    def group_task_waves(self, task_ids, window=DEFAULT_WAVE_WINDOW):
+        """按开始时间把任务分成波次，返回[(波次开始时间, [task_id, ...]), ...]"""
+        task_ids = sorted((task_id for task_id in task_ids if task_id in self.task_configs),
+                          key=lambda task_id: self.task_configs[task_id]['start_time'])
+        waves = []
+        for task_id in task_ids:
+            start_time = self.task_configs[task_id]['start_time']
+            if waves and (start_time - waves[-1][0]).total_seconds() <= window:
+                waves[-1][1].append(task_id)
+            else:
+                waves.append((start_time, [task_id]))
+        return waves
+    
+    def track_open_pages(self, delta):
+        """记录同时打开的任务页面数及其峰值；峰值页面数是内存占用的代理指标，不是实际采样的进程内存"""
+        self.open_page_count += delta
+        self.run_stats["peak_open_pages"] = max(self.run_stats.get("peak_open_pages", 0), self.open_page_count)
+    
+    @staticmethod
+    def union_span_seconds(spans):
+        """时间段并集的总时长（秒），重叠部分只计一次"""
+        total = 0
+        current_start = current_end = None
+        for start, end in sorted(spans):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
+    
+    async def run_task_wave(self, browser, contexts, server, wave_start, task_ids, lead_time, page_args, results, running_flag):
+        """执行一个波次：开始前lead_time秒加载本波次的页面，点击结束后关闭页面，返回加载成功的页面数"""
+        if wave_start is not None and lead_time is not None:
+            load_time = wave_start - timedelta(seconds=lead_time)
+            if self.setup_start_times:
+                # 即时加载：由本波次最早需要开始加载的页面决定波次的加载时间
+                load_time = min(self.setup_start_times[task_id] for task_id in task_ids)
+            wait_time = browser.scheduler.seconds_until(load_time)
+            if wait_time > 0:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 波次 {wave_start.strftime('%H:%M:%S')}（{len(task_ids)}个任务）: {wait_time:.0f}秒后开始加载页面")
+                await browser.scheduler.sleep_until(load_time, running_flag)
+        if not running_flag():
+            return 0
+        
+        # 页面数在浏览器新建、关闭页面时更新，加载中的页面和对冲页面也计入峰值
+        task_pages = await self.setup_task_pages(browser, contexts, server, task_ids, *page_args)
+        
+        # 执行任务
+        task_coroutines = []
+        for task_id in task_ids:
+            if task_id in task_pages and running_flag():
+                config = self.task_configs[task_id]
+                click_backend = config.get('click_backend', DEFAULT_CLICK_BACKEND)
+                max_in_flight = config.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 准备执行任务: {task_id}, 开始时间: {config['start_time'].strftime('%H:%M:%S')}, 间隔: {config['interval']}s, 持续时间: {config['duration']}s, 点击后端: {click_backend}, 最大并发: {max_in_flight}")
+                task_coroutines.append(
+                    self.run_single_task(
+                        browser, task_pages[task_id], task_id, browser.task_selectors.get(task_id, page_args[1]),
+                        config['start_time'], config['interval'], config['duration'], results, running_flag,
+                        click_backend, max_in_flight
+                    )
+                )
+        if task_coroutines:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始并发执行{len(task_coroutines)}个任务")
+            await asyncio.gather(*task_coroutines)
+        
+        # 本波次结束，关闭页面释放渲染进程内存
+        for page in task_pages.values():
+            if not page.is_closed():
+                try:
+                    browser.dispatcher.unregister_page(page)
+                    await page.close()
+                except Exception:
+                    pass
+        self.track_open_pages(-len(task_pages))
+        return len(task_pages)
+    
+    async def setup_task_pages(self, browser, contexts, server, task_ids, base_url, selector, max_attempts, running_flag,
+                               concurrency=DEFAULT_PAGE_SETUP_CONCURRENCY, jitter=DEFAULT_PAGE_SETUP_JITTER, semaphore=None):
+        """并发加载任务页面：先用一个页面预热SPA资源，其余页面在并发上限内并行加载，按顺序轮流分配到各个上下文"""
+        task_pages = {}
+        task_ids = [task_id for task_id in task_ids if task_id in self.task_configs]
+        if not task_ids:
+            return task_pages
+        if self.setup_start_times:
+            # 即时加载：最先需要加载的页面作为预热页面
+            task_ids.sort(key=lambda task_id: self.setup_start_times[task_id])
+        
+        setup_start = time.perf_counter()
+        # 多账号执行时传入共用的信号量，并发上限对所有账号生效
+        semaphore = semaphore or asyncio.Semaphore(max(1, int(concurrency)))
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始加载任务页面，共{len(task_ids)}个任务，并发上限 {concurrency}，随机抖动 {jitter}秒")
+        
+        task_contexts = {task_id: contexts[index % len(contexts)] for index, task_id in enumerate(task_ids)}
+        
+        async def setup_one(task_id, use_jitter):
+            context = task_contexts[task_id]
+            setup_start_time = self.setup_start_times.get(task_id)
+            if setup_start_time and browser.scheduler.seconds_until(setup_start_time) > 0:
+                await browser.scheduler.sleep_until(setup_start_time, running_flag)
+            async with semaphore:
+                if not running_flag():
+                    return
+                if use_jitter and jitter > 0:
+                    await asyncio.sleep(random.uniform(0, jitter))
+                page = await self.prepare_task_page(browser, context, server, task_id, base_url, selector, max_attempts, running_flag, semaphore)
+                if page:
+                    task_pages[task_id] = page
+        
+        # 第一个页面单独加载，让SPA公共资源进入缓存后再并行加载其余页面
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 预热页面: {task_ids[0]}")
+        await setup_one(task_ids[0], False)
+        if len(task_ids) > 1 and running_flag():
+            await asyncio.gather(*(setup_one(task_id, True) for task_id in task_ids[1:]))
+        
+        if not running_flag():
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务执行被用户终止")
+        
+        setup_wall_time = time.perf_counter() - setup_start
+        setup_times = [self.task_metrics[task_id]["page_setup_ms"] for task_id in task_ids if "page_setup_ms" in self.task_metrics.get(task_id, {})]
+        if setup_times:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 页面加载完成: 成功 {len(task_pages)}/{len(task_ids)}，总耗时 {setup_wall_time:.2f}秒，单页平均 {sum(setup_times) / len(setup_times):.0f}ms，最长 {max(setup_times):.0f}ms")
+        # 各波次的加载时间段可能重叠，记录并集的总时长而不是简单相加
+        self.setup_spans.append((setup_start, time.perf_counter()))
+        self.run_stats["page_setup_wall_ms"] = round(self.union_span_seconds(self.setup_spans) * 1000, 1)
+        
+        # 冷加载（有静态资源未命中缓存）和热加载（全部命中）分开统计
+        for cache_state in ("cold", "warm"):
+            state_times = [metrics["page_setup_ms"] for task_id, metrics in self.task_metrics.items()
+                           if task_id in task_pages and metrics.get("asset_cache") == cache_state]
+            if state_times:
+                self.run_stats[f"page_setup_{cache_state}_avg_ms"] = round(sum(state_times) / len(state_times), 1)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {'冷' if cache_state == 'cold' else '热'}加载页面: {len(state_times)}个，单页平均 {self.run_stats[f'page_setup_{cache_state}_avg_ms']:.0f}ms")
+        return task_pages
+    
+    def record_setup_duration(self, browser, task_id, setup_ms, success):
+        """记录本次加载耗时，成功时用胜出尝试的就绪耗时与运行前的单次尝试预测比较"""
+        timings = browser.setup_timings.get(task_id)
+        self.setup_history.record(browser.browser_type, task_id, setup_ms, timings, success)
+        metrics = self.task_metrics[task_id]
+        predicted_ms = metrics.get("predicted_setup_ms")
+        if predicted_ms is None or not success or not timings:
+            return
+        attempt_ms = timings["selector_ms"]
+        metrics["setup_prediction_error_ms"] = round(attempt_ms - predicted_ms, 1)
+        metrics["ready_lead_s"] = round(browser.scheduler.seconds_until(self.task_configs[task_id]['start_time']), 2)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 单次加载耗时预测 {predicted_ms:.0f}ms，实际 {attempt_ms:.0f}ms（第{timings.get('attempts', 1)}次尝试），误差 {metrics['setup_prediction_error_ms']:+.0f}ms，就绪时距开始 {metrics['ready_lead_s']:.1f}秒")
+    
+    def print_setup_prediction_report(self):
+        """汇总本次运行的加载耗时预测误差"""
+        entries = [metrics for metrics in self.task_metrics.values() if "setup_prediction_error_ms" in metrics]
+        if not entries:
+            return
+        errors = [metrics["setup_prediction_error_ms"] for metrics in entries]
+        ready_leads = [metrics["ready_lead_s"] for metrics in entries]
+        late = sum(1 for lead in ready_leads if lead < self.setup_history.safety_margin)
+        self.run_stats["setup_prediction_mae_ms"] = round(sum(abs(error) for error in errors) / len(errors), 1)
+        self.run_stats["setup_prediction_bias_ms"] = round(sum(errors) / len(errors), 1)
+        self.run_stats["setup_ready_late"] = late
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 加载耗时预测: {len(entries)}个页面，平均绝对误差 {self.run_stats['setup_prediction_mae_ms']:.0f}ms，平均偏差 {self.run_stats['setup_prediction_bias_ms']:+.0f}ms，就绪时距开始最少 {min(ready_leads):.1f}秒，晚于就绪余量 {late}个")
+    
+    async def prepare_task_page(self, browser, context, server, task_id, base_url, selector, max_attempts, running_flag, semaphore=None):
+        """加载单个任务页面、绑定响应监控并上传页面信息，失败返回None"""
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 加载任务: {task_id}")
+        page_start = time.perf_counter()
+        page, success = await browser.setup_task_page(
+            context, base_url, task_id, selector, max_attempts, 0, running_flag, semaphore
+        )
+        setup_ms = (time.perf_counter() - page_start) * 1000
+        self.task_metrics.setdefault(task_id, {})["page_setup_ms"] = round(setup_ms, 1)
+        if task_id in browser.setup_timings:
+            self.task_metrics[task_id]["page_ready_ms"] = browser.setup_timings[task_id]["selector_ms"]
+        if self.setup_history:
+            self.record_setup_duration(browser, task_id, setup_ms, success)
+        if page and browser.asset_cache:
+            cache_state = browser.asset_cache.page_state(page)
+            if cache_state:
+                self.task_metrics[task_id]["asset_cache"] = cache_state
+        
+        if not success:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 任务页面加载失败: {task_id}，耗时 {setup_ms:.0f}ms")
+            return None
+        
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 任务页面加载成功: {task_id}，耗时 {setup_ms:.0f}ms")
+        # 绑定API响应监控
+        await browser.monitor_api_response(page, task_id, self.reward_result_cache)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ API响应监控已绑定: {task_id}")
+        
+        # 提取页面信息并上传（上传放到线程池，避免阻塞其余页面的加载）
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 提取页面信息: {task_id}")
+        page_info = await browser.extract_page_info(page, task_id)
+        if page_info:
+            uploaded, upload_success = await asyncio.get_running_loop().run_in_executor(None, server.upload_page_info_if_changed, page_info)
+            stat_key = "page_info_uploaded" if uploaded else "page_info_unchanged"
+            self.run_stats[stat_key] = self.run_stats.get(stat_key, 0) + 1
+            if uploaded:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 页面信息提取成功，上传: {'成功' if upload_success else '失败'}")
+            else:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 页面信息提取成功，与上次上传的内容相同，跳过上传")
+        
+        return page
+    
+    def print_click_backend_report(self):
+        """按点击后端汇总点击速率和派发延迟"""
+        backend_stats = {}
+        for metrics in self.task_metrics.values():
+            if "click_backend" in metrics:
+                backend_stats.setdefault(metrics["click_backend"], []).append(metrics)
+        for backend, entries in backend_stats.items():
+            avg_rate = sum(m["click_rate"] for m in entries) / len(entries)
+            avg_latency = sum(m["dispatch_latency_avg_ms"] for m in entries) / len(entries)
+            max_latency = max(m["dispatch_latency_max_ms"] for m in entries)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 点击后端 {backend}: {len(entries)}个任务，平均速率 {avg_rate:.2f}次/秒，平均派发延迟 {avg_latency:.2f}ms，最大派发延迟 {max_latency:.2f}ms")
+    
+    async def run_pre_start_checks(self, browser, page, task_id, target_selector, start_time, running_flag):
+        """开始前在各T-minus时间点复查按钮和页面响应，失败时若能在开始前完成则原地重新加载，否则放弃重新加载"""
+        metrics = self.task_metrics.setdefault(task_id, {})
+        verify_timeout = self.pre_start_config.get("verify_timeout", PRE_START_VERIFY_TIMEOUT)
+        # 原地重新加载不需要新建页面，按该页面本次加载时按钮就绪的耗时估计
+        reload_estimate = metrics["page_ready_ms"] / 1000 if "page_ready_ms" in metrics else DEFAULT_RELOAD_ESTIMATE
+        checks = failures = reloads = 0
+        phase_ms = 0.0
+        ok = True
+        for offset in sorted(self.pre_start_config.get("offsets", DEFAULT_PRE_START_OFFSETS), reverse=True):
+            check_time = start_time - timedelta(seconds=offset)
+            if browser.scheduler.seconds_until(check_time) < 0:
+                continue
+            await browser.scheduler.sleep_until(check_time, running_flag)
+            if not running_flag() or page.is_closed():
+                break
+            
+            check_start = time.perf_counter()
+            checks += 1
+            ok, message = await browser.verify_task_page(page, target_selector, verify_timeout)
+            if not ok:
+                failures += 1
+                remaining = browser.scheduler.seconds_until(start_time)
+                if remaining > reload_estimate + verify_timeout:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ⚠️ 开始前复查失败（{message}），距开始 {remaining:.1f}秒，重新加载页面")
+                    reloads += 1
+                    ok, message = await browser.reload_task_page(page, target_selector, (remaining - verify_timeout) * 1000)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 重新加载{'成功' if ok else '失败: ' + message}")
+                else:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: ⚠️ 开始前复查失败（{message}），距开始 {remaining:.1f}秒，来不及重新加载（预计 {reload_estimate:.1f}秒）")
+            phase_ms += (time.perf_counter() - check_start) * 1000
+        
+        if checks:
+            metrics.update({
+                "pre_start_checks": checks,
+                "pre_start_failures": failures,
+                "pre_start_reloads": reloads,
+                "pre_start_ms": round(phase_ms, 1),
+                "pre_start_status": "stale" if not ok else ("reloaded" if reloads else "ok")
+            })
+    
+    async def prewarm_task_page(self, browser, page, task_id, start_time, running_flag):
+        """开始前lead_time秒在页面内预热到接口域名的连接，开始时间已过时跳过"""
+        lead_time = self.prewarm_config.get("lead_time", DEFAULT_PREWARM_LEAD_TIME)
+        prewarm_time = start_time - timedelta(seconds=lead_time)
+        if browser.scheduler.seconds_until(prewarm_time) > 0:
+            await browser.scheduler.sleep_until(prewarm_time, running_flag)
+        remaining = browser.scheduler.seconds_until(start_time)
+        if remaining <= 0 or not running_flag() or page.is_closed():
+            return
+        
+        origin = self.prewarm_config.get("origin", DEFAULT_PREWARM_ORIGIN)
+        success, prewarm_ms = await browser.prewarm_connection(
+            page, origin, f"{origin}{MISSION_INFO_API_PATH}?task_id={task_id}", min(PREWARM_TIMEOUT, remaining)
+        )
+        self.task_metrics.setdefault(task_id, {}).update({"prewarmed": success, "prewarm_ms": round(prewarm_ms, 1)})
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 连接预热{'完成' if success else '失败'}，耗时 {prewarm_ms:.0f}ms")
+    
+    def print_first_response_report(self, browser):
+        """首次点击到领取接口响应的耗时，按预热组和对照组汇总（预热组包含预热失败的任务，按分组而不是预热结果比较）"""
+        groups = {"prewarm": [], "control": [], "disabled": []}
+        group_labels = {"prewarm": "预热组", "control": "对照组（不预热）", "disabled": "未启用预热"}
+        for task_id, first in browser.first_responses.items():
+            metrics = self.task_metrics.setdefault(task_id, {})
+            metrics["first_response_ms"] = round(first["elapsed_ms"], 1)
+            groups[self.prewarm_groups.get(task_id, "disabled")].append(first["elapsed_ms"])
+        for group, latencies in groups.items():
+            if not latencies:
+                continue
+            self.run_stats[f"first_response_{group}_count"] = len(latencies)
+            self.run_stats[f"first_response_{group}_avg_ms"] = round(sum(latencies) / len(latencies), 1)
+            self.run_stats[f"first_response_{group}_max_ms"] = round(max(latencies), 1)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 首次领取请求响应耗时（{group_labels[group]}）: {len(latencies)}个任务，平均 {self.run_stats[f'first_response_{group}_avg_ms']:.1f}ms，最大 {self.run_stats[f'first_response_{group}_max_ms']:.1f}ms")
+    
+    def print_pre_start_report(self):
+        """开始前复查作为单独的阶段汇总"""
+        entries = [metrics for metrics in self.task_metrics.values() if "pre_start_checks" in metrics]
+        if not entries:
+            return
+        statuses = [metrics["pre_start_status"] for metrics in entries]
+        phase_times = [metrics["pre_start_ms"] for metrics in entries]
+        self.run_stats.update({
+            "pre_start_pages": len(entries),
+            "pre_start_failed": sum(1 for metrics in entries if metrics["pre_start_failures"]),
+            "pre_start_reloaded": statuses.count("reloaded"),
+            "pre_start_stale": statuses.count("stale"),
+            "pre_start_avg_ms": round(sum(phase_times) / len(phase_times), 1),
+            "pre_start_max_ms": max(phase_times)
+        })
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始前复查: {len(entries)}个页面，复查失败 {self.run_stats['pre_start_failed']}，重新加载成功 {self.run_stats['pre_start_reloaded']}，仍失效 {self.run_stats['pre_start_stale']}，单页平均 {self.run_stats['pre_start_avg_ms']:.0f}ms，最长 {self.run_stats['pre_start_max_ms']:.0f}ms")
+    
+    async def run_single_task(self, browser, page, task_id, target_selector, start_time, interval, duration, results, running_flag, click_backend=DEFAULT_CLICK_BACKEND, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
         """运行单个任务"""
         try:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始执行任务: {task_id}")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 等待开始时间: {start_time.strftime('%H:%M:%S')}")
             
-            # 计算等待时间
-            current_time = datetime.now()
-            wait_time = (start_time - current_time).total_seconds()
+            # 计算等待时间（已按服务端时钟校正）
+            wait_time = browser.scheduler.seconds_until(start_time)
             if wait_time > 0:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] 需要等待: {wait_time:.2f}秒")
             else:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始时间已过，立即执行")
             
-            await browser.wait_for_start_time(start_time, running_flag)
+            if self.pre_start_config.get("enabled", True):
+                await self.run_pre_start_checks(browser, page, task_id, target_selector, start_time, running_flag)
+            if self.prewarm_groups.get(task_id) == "prewarm":
+                await self.prewarm_task_page(browser, page, task_id, start_time, running_flag)
+            
+            release_error = await browser.wait_for_start_time(start_time, running_flag, task_id)
+            if release_error is not None:
+                self.task_metrics.setdefault(task_id, {})["release_error_ms"] = round(release_error, 3)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id}: 开始时间释放误差 {release_error:.2f}ms")
             
             if not running_flag():
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] 任务 {task_id} 被用户终止")
@@ -257,7 +1030,34 @@ class Tasks:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始执行点击任务: {task_id}")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] 点击参数: 选择器={target_selector}, 间隔={interval}s, 持续时间={duration}s")
             
-            await browser.perform_task_clicks(page, task_id, target_selector, interval, duration, results, running_flag)
+            click_stats = await browser.perform_task_clicks(page, task_id, target_selector, interval, duration, results, running_flag, click_backend, max_in_flight)
+            if browser.rate_controller and task_id in browser.rate_controller.intervals:
+                self.task_metrics.setdefault(task_id, {}).update({
+                    "rate_adjustments": browser.rate_controller.adjustment_counts[task_id],
+                    "final_interval_ms": round(browser.rate_controller.get_interval(task_id) * 1000, 3)
+                })
+            self.task_metrics.setdefault(task_id, {}).update({
+                "click_backend": click_stats["backend"],
+                "click_count": click_stats["click_count"],
+                "click_rate": round(click_stats["click_rate"], 2),
+                "target_interval_ms": round(interval * 1000, 3),
+                "achieved_interval_ms": round(click_stats["achieved_interval_ms"], 3),
+                "max_in_flight": max_in_flight,
+                "dispatch_latency_avg_ms": round(click_stats["latency_avg_ms"], 3),
+                "dispatch_latency_max_ms": round(click_stats["latency_max_ms"], 3)
+            })
+            if "stop_reason" in click_stats:
+                self.task_metrics[task_id].update({
+                    "stop_reason": click_stats["stop_reason"],
+                    "stop_time": click_stats["stop_time"],
+                    "stop_latency_ms": round(click_stats["stop_latency_ms"], 3)
+                })
+                # 提前结束的任务立即关闭页面，释放渲染进程资源
+                try:
+                    browser.dispatcher.unregister_page(page)
+                    await page.close()
+                except Exception:
+                    pass
             
             if task_id in results:
                 success, message = results[task_id]
@@ -272,5 +1072,16 @@ class Tasks:
             traceback.print_exc()
             results[task_id] = (False, error_message)
 
+def run_task_shard(shard, task_configs, browser_args, stop_event, result_queue):
+    """工作进程入口：用独立的事件循环和浏览器执行一个分片的任务，结果通过队列交回协调进程"""
+    worker = Tasks()
+    worker.task_configs = task_configs
+    worker.selected_tasks = list(task_configs)
+    try:
+        success, message = asyncio.run(worker.execute_tasks(*browser_args, lambda: not stop_event.is_set(), shard=shard))
+    except Exception as e:
+        success, message = False, f"工作进程执行错误: {str(e)}"
+    result_queue.put((shard["index"], success, message, worker.reward_result_cache, worker.task_metrics, worker.run_stats))
+
 # 全局任务管理器实例
 tasks = Tasks()